@@ -41,17 +41,15 @@ import re
 import sys
 from importlib import import_module
 from types import FunctionType
-from typing import Iterable, Iterator, List, Optional, Set, TypeVar, Union, get_type_hints
+from typing import Any, Iterable, Iterator, List, Optional, Set, TypeVar, Union, get_type_hints
 
 # 3rd party
-import dict2css
 from docutils import nodes
 from docutils.parsers.rst.directives import unchanged_required
 from docutils.statemachine import ViewList
-from domdf_python_tools.paths import PathPlus
-from domdf_python_tools.stringlist import DelimitedList, StringList
 
 # This all has to be up here so it's triggered before Sphinx is imported.
+# It doesn't import anything, so it costs nothing to leave at import time.
 if sys.version_info >= (3, 10):
 	# stdlib
 	import types
@@ -60,13 +58,19 @@ if sys.version_info >= (3, 10):
 # 3rd party
 from sphinx.application import Sphinx
 from sphinx.environment import BuildEnvironment
-from sphinx.util.docutils import SphinxDirective
-from sphinx_toolbox.more_autodoc.typehints import format_annotation
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective, new_document, sphinx_domains
 from sphinx_toolbox.utils import Purger, SphinxExtMetadata
-from sphinxcontrib.default_values import format_default_value
 
 # this package
+from sphinx_highlights import _offline
+from sphinx_highlights._cache import candidate_pools, failure_cache, find_source, highlight_cache
 from sphinx_highlights._eval_type import monkeypatcher
+from sphinx_highlights._highlight import Highlight, format_title, get_summary, layout_signature
+from sphinx_highlights._modules import find_autodoc_packages, import_scope
+from sphinx_highlights._render import BulletListWriter, HighlightsWriter, PanelsWriter
+from sphinx_highlights._shared_cache import evict_shared_cache, get_shared_cache
 
 __author__: str = "Dominic Davis-Foster"
 __copyright__: str = "2021 Dominic Davis-Foster"
@@ -75,17 +79,30 @@ __version__: str = "0.6.0"
 __email__: str = "dominic@davis-foster.co.uk"
 
 __all__ = [
+		"HighlightsPostTransform",
 		"SphinxHighlightsDirective",
 		"copy_assets",
 		"format_parameter",
 		"format_signature",
 		"setup",
 		"get_random_sample",
+		"get_summary",
+		"get_writer",
+		"highlights_placeholder",
+		"resolve_highlight",
+		"sample_highlights",
 		]
 
 _T = TypeVar("_T")
 
 sphinx_highlights_purger = Purger("all_sphinx_highlights")
+deferred_highlights_purger = Purger("all_deferred_sphinx_highlights")
+
+logger = logging.getLogger(__name__)
+
+_sentinel = object()
+
+_default_column_classes = "col-xl-6 col-lg-6 col-md-12 col-sm-12 col-xs-12 p-2"
 
 
 def format_parameter(param: inspect.Parameter) -> str:
@@ -97,6 +114,10 @@ def format_parameter(param: inspect.Parameter) -> str:
 	:return: The reStructuredText string.
 	"""
 
+	# 3rd party
+	from sphinx_toolbox.more_autodoc.typehints import format_annotation
+	from sphinxcontrib.default_values import format_default_value
+
 	formatted = param.name
 
 	# Add annotation and default value
@@ -114,50 +135,135 @@ def format_parameter(param: inspect.Parameter) -> str:
 	return formatted
 
 
-def format_signature(obj: Union[type, FunctionType]) -> StringList:
+def format_signature(obj: Union[type, FunctionType]) -> List[str]:
 	"""
 	Format the signature of the given object, for insertion into the highlight panel.
 
+	.. versionchanged:: 0.7.0
+
+		Returns a :class:`list` rather than a :class:`domdf_python_tools.stringlist.StringList`.
+
 	:param obj:
 
 	:return: A list of reStructuredText lines.
 	"""
 
+	# 3rd party
+	from sphinx_toolbox.more_autodoc.typehints import format_annotation
+
 	with monkeypatcher():
 		obj.__annotations__ = get_type_hints(obj)
 
 	signature: inspect.Signature = inspect.signature(obj)
 
-	buf = StringList(".. parsed-literal::")
-	buf.blankline()
-	buf.indent_type = "    "
-	buf.indent_size = 1
-
 	if signature.return_annotation is not inspect.Signature.empty and not isinstance(obj, type):
-		return_annotation = f") -> {format_annotation(signature.return_annotation)}"
+		return_annotation = format_annotation(signature.return_annotation)
 	else:
-		return_annotation = f")"
+		return_annotation = ''
+
+	arguments = [format_parameter(param) for param in signature.parameters.values()]
+
+	return layout_signature(obj.__name__, arguments, return_annotation)
+
+
+def resolve_highlight(app: Sphinx, obj_name: str) -> Highlight:
+	"""
+	Extract the data for the highlight of the object with the given name.
+
+	Objects in packages listed in :confval:`highlights_inventories` are resolved from the
+	local inventory and stubs; everything else is imported.
+
+	The result is cached in-process until the file named by ``obj_name`` or the file
+	the object is defined in changes, and in :confval:`highlights_cache_dir` if configured.
+
+	.. versionadded:: 0.7.0
+
+	:param app: The Sphinx application.
+	:param obj_name: The fully qualified name of the object.
+	"""
+
+	highlight = highlight_cache.get(app, obj_name)
+	if highlight is not None:
+		return highlight
+
+	highlight = _offline.resolve(app, obj_name)
+	defining_files: List[str] = []
+
+	if highlight is None:
+		shared_cache = get_shared_cache(app)
+		source_file = find_source(app, obj_name)
+
+		if shared_cache is not None and source_file is not None:
+			key = shared_cache.key(obj_name, source_file)
+			entry = shared_cache.get(key)
+
+			if entry is None:
+				highlight = _import_highlight(obj_name, preserve_annotations=app.config.highlights_unload_modules)
+				defining_files = _defining_files(obj_name, source_file)
+				shared_cache.put(key, highlight, defining_files)
+			else:
+				highlight, defining_files = entry
+
+		else:
+			highlight = _import_highlight(obj_name, preserve_annotations=app.config.highlights_unload_modules)
+			defining_files = _defining_files(obj_name, source_file)
 
-	total_length = len(obj.__name__) + len(return_annotation)
+	highlight_cache.add(app, highlight, defining_files)
+	return highlight
 
-	arguments_buf: DelimitedList[str] = DelimitedList()
 
-	param: inspect.Parameter
-	for param in signature.parameters.values():
-		arguments_buf.append(f"{format_parameter(param)}")
-		total_length += len(arguments_buf[-1])
+def _defining_files(obj_name: str, source_file: Optional[str]) -> List[str]:
+	# The file the (already imported) object is defined in, if it isn't the one its name points to.
+	module_name, _, attr = obj_name.rpartition('.')
+	obj = getattr(sys.modules.get(module_name), attr, None)
 
-	if total_length <= 60:
-		signature_buf = StringList(''.join([f"{obj.__name__}(", f"{arguments_buf:, }", return_annotation]))
+	try:
+		defining_file = inspect.getsourcefile(obj)  # type: ignore[arg-type]
+	except TypeError:
+		return []
+
+	if defining_file is None or defining_file == source_file:
+		return []
+
+	return [defining_file]
+
+
+def _import_highlight(obj_name: str, preserve_annotations: bool = False) -> Highlight:
+	name_parts = obj_name.split('.')
+	module = import_module('.'.join(name_parts[:-1]))
+	obj = getattr(module, name_parts[-1])
+
+	if isinstance(obj, FunctionType):
+		kind = "function"
+	elif isinstance(obj, type):
+		kind = "class"
 	else:
-		signature_buf = StringList([f"{obj.__name__}("])
-		signature_buf.indent_type = "  "
-		with signature_buf.with_indent_size(1):
-			signature_buf.extend([f"{arguments_buf:,\n}" + ',', return_annotation])
+		kind = "object"
 
-	buf.extend(signature_buf)
+	if preserve_annotations:
+		# Don't keep the evaluated type hints alive after the module is unloaded.
+		# Classes may inherit __annotations__, whereas functions always have their own.
+		if isinstance(obj, type):
+			original_annotations = obj.__dict__.get("__annotations__", _sentinel)
+		else:
+			original_annotations = getattr(obj, "__annotations__", _sentinel)
+		try:
+			signature = format_signature(obj)
+		finally:
+			if original_annotations is _sentinel:
+				del obj.__annotations__
+			else:
+				obj.__annotations__ = original_annotations
+	else:
+		signature = format_signature(obj)
 
-	return buf
+	return Highlight(
+			name=obj_name,
+			title=format_title(obj_name, kind),
+			module=module.__name__,
+			signature=signature,
+			summary=get_summary(obj.__doc__),
+			)
 
 
 def get_random_sample(items: Iterable[_T]) -> List[_T]:
@@ -187,6 +293,96 @@ def extend(sequence: Iterable[_T], minsize: int) -> List[_T]:
 	return output
 
 
+def sample_highlights(
+		env: BuildEnvironment,
+		candidates: Iterable[str],
+		location: Any = None,
+		) -> List[Highlight]:
+	"""
+	Choose four random objects from ``candidates`` and resolve them.
+
+	Objects which cannot be resolved are skipped with a warning,
+	and are not retried in later builds until one of the files involved changes.
+
+	Directives with the same candidates share a :class:`~._cache.CandidatePool`,
+	so each distinct list of objects is only filtered and resolved once per build.
+
+	.. versionadded:: 0.7.0
+
+	:param env: The Sphinx build environment.
+	:param candidates: The fully qualified names of the objects to choose from.
+	:param location: The location of the directive, for warnings.
+	"""
+
+	pool = candidate_pools.get(candidates)
+	failures = pool.get_failures(env)
+
+	for obj_name, failure in failures.items():
+		logger.warning(
+				f"Skipping highlight {obj_name!r}, which previously failed: {failure.summary}",
+				location=location,
+				)
+
+	remaining = [obj_name for obj_name in pool.names if obj_name not in failures]
+
+	with import_scope(env.app):
+		while remaining:
+			highlights = []
+
+			for obj_name in get_random_sample(remaining):
+				loaded_modules = set(sys.modules)
+
+				try:
+					if obj_name not in pool.highlights:
+						pool.highlights[obj_name] = resolve_highlight(env.app, obj_name)
+					highlights.append(pool.highlights[obj_name])
+				except Exception as e:
+					new_modules = set(sys.modules) - loaded_modules
+					failure = failures[obj_name] = failure_cache.record(env, obj_name, e, new_modules)
+					logger.warning(
+							f"Unable to create highlight for {obj_name!r}: {failure.summary}",
+							location=location,
+							)
+					remaining.remove(obj_name)
+					break
+			else:
+				return highlights
+
+	return []
+
+
+def get_writer(app: Sphinx, colours: Iterable[str], classes: Iterable[str]) -> HighlightsWriter:
+	"""
+	Returns the writer for the output format of the current builder.
+
+	For ``HTML`` builders the panel colours are sampled from ``colours`` when the writer is created.
+
+	.. versionadded:: 0.7.0
+
+	:param app: The Sphinx application.
+	:param colours: The names of the colours for the panels.
+	:param classes: CSS classes for each panel's column.
+	"""
+
+	assert app.builder is not None
+	if app.builder.format.lower() == "html":
+		return PanelsWriter(itertools.cycle(get_random_sample(colours)), classes)
+	else:
+		return BulletListWriter()
+
+
+class highlights_placeholder(nodes.General, nodes.Element):
+	"""
+	Stands in for the output of the :rst:dir:`api-highlights` directive when :confval:`highlights_deferred`
+	is enabled, until the highlights are chosen and rendered as the document is written.
+
+	The ``candidates`` attribute holds the fully qualified names of the objects,
+	and ``colours`` and ``column_classes`` the values of the directive's options.
+
+	.. versionadded:: 0.7.0
+	"""  # noqa: D400
+
+
 class SphinxHighlightsDirective(SphinxDirective):
 	"""
 	Provides the :rst:dir:`api-highlights` directive.
@@ -211,114 +407,185 @@ class SphinxHighlightsDirective(SphinxDirective):
 
 		return filter(bool, re.split("[,; ]", self.options.get(option, default)))
 
-	def run_html(self) -> List[nodes.Node]:
+	def expand_name(self, obj_name: str) -> str:
 		"""
-		Generate output for ``HTML`` builders.
+		Replace a leading ``.`` in ``obj_name`` with the value of the ``:module:`` option.
+
+		.. versionadded:: 0.7.0
+
+		:param obj_name:
 		"""
 
-		# colours = itertools.cycle(self.delimited_get("colours", "#6ab0de"))
-		colours = itertools.cycle(get_random_sample(self.delimited_get("colours", "blue")))
-		classes = list(self.delimited_get("class", "col-xl-6 col-lg-6 col-md-12 col-sm-12 col-xs-12 p-2"))
-
-		content = StringList()
-		content.append(".. panels::")
-		content.indent_type = "    "
-		content.indent_size = 1
-		content.append(":container: container-xl pb-4 sphinx-highlights")
-		content.blankline()
-
-		for obj_name in get_random_sample(sorted(set(self.content))):
-			if self.options.get("module", '') and obj_name.startswith('.'):
-				obj_name = obj_name.replace('.', f"{self.options['module']}.", 1)
-
-			name_parts = obj_name.split('.')
-			module = import_module('.'.join(name_parts[:-1]))
-			obj = getattr(module, name_parts[-1])
-
-			colour_class = f"highlight-{next(colours)}"
-			content.append(f":column: {DelimitedList((*classes, colour_class)): }")
-
-			if isinstance(obj, FunctionType):
-				content.append(f":func:`{'.'.join(name_parts[1:])}() <.{obj_name}>`")
-			elif isinstance(obj, type):
-				content.append(f":class:`{'.'.join(name_parts[1:])} <.{obj_name}>`")
-			else:
-				content.append(f":py:obj:`{'.'.join(name_parts[1:])} <.{obj_name}>`")
+		if self.options.get("module", '') and obj_name.startswith('.'):
+			obj_name = obj_name.replace('.', f"{self.options['module']}.", 1)
+
+		return obj_name
 
-			content.append('^' * len(content[-1]))
-			content.blankline()
-			# content.append(f".. function:: {name_parts[-1]} {stringify_signature(inspect.signature(obj))}")
-			content.append(format_signature(obj))
-			content.blankline()
-			content.append(inspect.cleandoc(obj.__doc__ or '').split("\n\n")[0])
-			content.blankline()
-			content.append(f"See more in :mod:`{module.__name__}`.")
-			content.append("---")
+	def get_candidates(self) -> List[str]:
+		"""
+		Returns the fully qualified names of the objects in the content of the directive, sorted and without duplicates.
+
+		.. versionadded:: 0.7.0
+		"""
+
+		return sorted({self.expand_name(obj_name) for obj_name in self.content})
+
+	def get_highlights(self) -> List[Highlight]:
+		"""
+		Choose four random objects from the content of the directive and resolve them.
+
+		Objects which cannot be resolved are skipped with a warning,
+		and are not retried in later builds until one of the files involved changes.
+
+		.. versionadded:: 0.7.0
+		"""
+
+		return sample_highlights(self.env, self.get_candidates(), location=(self.env.docname, self.lineno))
+
+	def get_writer(self) -> HighlightsWriter:
+		"""
+		Returns the writer for the output format of the current builder.
+
+		.. versionadded:: 0.7.0
+		"""
+
+		return get_writer(
+				self.env.app,
+				self.delimited_get("colours", "blue"),
+				self.delimited_get("class", _default_column_classes),
+				)
+
+	def render(self, writer: HighlightsWriter) -> List[nodes.Node]:
+		"""
+		Choose the highlights and render them with the given writer.
+
+		.. versionadded:: 0.7.0
 
-		content.pop(-1)
+		:param writer:
+		"""
 
 		targetid = f'sphinx-highlights-{self.env.new_serialno("sphinx-highlights"):d}'
 		targetnode = nodes.target('', '', ids=[targetid])
 
+		highlights = self.get_highlights()
+		if not highlights:
+			# Still record the page, so it is reread (and the failures retried) on the next build.
+			sphinx_highlights_purger.add_node(self.env, nodes.container(), targetnode, self.lineno)
+			return []
+
+		content = writer.render(highlights)
+
 		view = ViewList(content)
-		body_node = nodes.paragraph(rawsource=str(content))
+		body_node = writer.node_class(rawsource='\n'.join(content))
 		self.state.nested_parse(view, self.content_offset, body_node)  # type: ignore[arg-type]
 
 		sphinx_highlights_purger.add_node(self.env, body_node, targetnode, self.lineno)
 
 		return [targetnode, body_node]
 
-	def run_generic(self) -> List[nodes.Node]:
+	def run_html(self) -> List[nodes.Node]:
 		"""
-		Generate generic reStructuredText output.
+		Generate output for ``HTML`` builders.
 		"""
 
-		content = StringList()
-		content.indent_type = ' '
+		# colours = itertools.cycle(self.delimited_get("colours", "#6ab0de"))
+		colours = itertools.cycle(get_random_sample(self.delimited_get("colours", "blue")))
+		classes = self.delimited_get("class", _default_column_classes)
+
+		return self.render(PanelsWriter(colours, classes))
 
-		for obj_name in get_random_sample(sorted(set(self.content))):
-			if self.options.get("module", '') and obj_name.startswith('.'):
-				obj_name = obj_name.replace('.', f"{self.options['module']}.", 1)
+	def run_generic(self) -> List[nodes.Node]:
+		"""
+		Generate generic reStructuredText output.
+		"""
 
-			name_parts = obj_name.split('.')
-			module = import_module('.'.join(name_parts[:-1]))
-			obj = getattr(module, name_parts[-1])
+		return self.render(BulletListWriter())
 
-			if isinstance(obj, FunctionType):
-				content.append(f"* :func:`{'.'.join(name_parts[1:])}() <.{obj_name}>`")
-			elif isinstance(obj, type):
-				content.append(f"* :class:`{'.'.join(name_parts[1:])} <.{obj_name}>`")
-			else:
-				content.append(f"* :py:obj:`{'.'.join(name_parts[1:])} <.{obj_name}>`")
+	def run_deferred(self) -> List[nodes.Node]:
+		"""
+		Generate a :class:`~.highlights_placeholder`, to be rendered when the document is written.
 
-			with content.with_indent_size(2):
-				content.blankline()
-				content.append(format_signature(obj))
-				content.blankline()
-				content.append(inspect.cleandoc(obj.__doc__ or '').split("\n\n")[0])
-				content.blankline()
+		.. versionadded:: 0.7.0
+		"""
 
 		targetid = f'sphinx-highlights-{self.env.new_serialno("sphinx-highlights"):d}'
 		targetnode = nodes.target('', '', ids=[targetid])
 
-		view = ViewList(content)
-		body_node = nodes.container(rawsource=str(content))
-		self.state.nested_parse(view, self.content_offset, body_node)  # type: ignore[arg-type]
+		placeholder = highlights_placeholder(
+				candidates=self.get_candidates(),
+				colours=list(self.delimited_get("colours", "blue")),
+				column_classes=list(self.delimited_get("class", _default_column_classes)),
+				)
+		self.set_source_info(placeholder)
 
-		sphinx_highlights_purger.add_node(self.env, body_node, targetnode, self.lineno)
+		deferred_highlights_purger.add_node(self.env, placeholder, targetnode, self.lineno)
 
-		return [targetnode, body_node]
+		return [targetnode, placeholder]
 
 	def run(self) -> List[nodes.Node]:
 		"""
 		Create the highlights node.
 		"""
 
-		assert self.env.app.builder is not None
-		if self.env.app.builder.format.lower() == "html":
-			return self.run_html()
+		if self.config.highlights_deferred:
+			return self.run_deferred()
 		else:
-			return self.run_generic()
+			return self.render(self.get_writer())
+
+
+class HighlightsPostTransform(SphinxPostTransform):
+	"""
+	Choose and render the highlights for each :class:`~.highlights_placeholder` as the document is written.
+
+	.. versionadded:: 0.7.0
+	"""
+
+	# Before the cross-references in the highlights are resolved.
+	default_priority = 5
+
+	def run(self, **kwargs) -> None:  # noqa: D102
+		for node in list(self.document.traverse(highlights_placeholder)):
+			node.replace_self(self.render(node))
+
+	def render(self, node: highlights_placeholder) -> List[nodes.Node]:
+		"""
+		Returns the nodes to replace the given placeholder with.
+
+		:param node:
+		"""
+
+		writer = get_writer(self.app, node["colours"], node["column_classes"])
+
+		highlights = sample_highlights(self.env, node["candidates"], location=node)
+		if not highlights:
+			return []
+
+		content = writer.render(highlights)
+		body_node = writer.node_class(rawsource='\n'.join(content))
+		body_node += self.parse(content)
+
+		return [body_node]
+
+	def parse(self, content: List[str]) -> List[nodes.Node]:
+		"""
+		Parse the given reStructuredText in the context of the document being written.
+
+		:param content:
+		"""
+
+		# 3rd party
+		from docutils.parsers.rst import Parser
+
+		document = new_document(self.document["source"], self.document.settings)
+		document.reporter = self.document.reporter
+
+		# The default domain is only set while reading.
+		self.env.temp_data["default_domain"] = self.env.domains.get(self.config.primary_domain)
+
+		with sphinx_domains(self.env):
+			Parser().parse('\n'.join(content), document)
+
+		return document.children
 
 
 _colour_map = {
@@ -340,6 +607,10 @@ def copy_assets(app: Sphinx, exception: Optional[Exception] = None) -> None:
 	if exception:  # pragma: no cover
 		return
 
+	# 3rd party
+	import dict2css
+	from domdf_python_tools.paths import PathPlus
+
 	style = {}
 
 	for colour, hex_ in _colour_map.items():
@@ -372,6 +643,28 @@ def env_get_outdated(
 	return [node["docname"] for node in getattr(env, sphinx_highlights_purger.attr_name, ())]
 
 
+def env_before_read_docs(app: Sphinx, env: BuildEnvironment, docnames: List[str]) -> None:
+	candidate_pools.clear()
+
+	if app.config.highlights_unload_modules:
+		env.sphinx_highlights_autodoc_packages = find_autodoc_packages(env)  # type: ignore[attr-defined]
+
+
+def env_updated(app: Sphinx, env: BuildEnvironment) -> List[str]:
+	return [node["docname"] for node in getattr(env, deferred_highlights_purger.attr_name, ())]
+
+
+def env_merge_info(app: Sphinx, env: BuildEnvironment, docnames: Set[str], other: BuildEnvironment) -> None:
+	# ``other`` is a copy of the whole environment, so only take the nodes of the documents it read.
+	for purger in (sphinx_highlights_purger, deferred_highlights_purger):
+		if hasattr(other, purger.attr_name):
+			if not hasattr(env, purger.attr_name):
+				setattr(env, purger.attr_name, [])
+			getattr(env, purger.attr_name).extend(
+					node for node in getattr(other, purger.attr_name) if node["docname"] in docnames
+					)
+
+
 def setup(app: Sphinx) -> SphinxExtMetadata:
 	"""
 	Setup :mod:`sphinx_highlights`.
@@ -382,10 +675,25 @@ def setup(app: Sphinx) -> SphinxExtMetadata:
 	app.setup_extension("sphinx_panels")
 	app.setup_extension("sphinx_toolbox.tweaks.sphinx_panels_tabs")
 	app.add_directive("api-highlights", SphinxHighlightsDirective)
+	app.add_post_transform(HighlightsPostTransform)
 	app.add_css_file("css/sphinx_highlights.css")
 	app.connect("build-finished", copy_assets)
+	app.connect("build-finished", evict_shared_cache)
+	app.connect("env-before-read-docs", env_before_read_docs)
 	app.connect("env-get-outdated", env_get_outdated)
 	app.connect("env-purge-doc", sphinx_highlights_purger.purge_nodes)
+	app.connect("env-purge-doc", deferred_highlights_purger.purge_nodes)
+	app.connect("env-merge-info", failure_cache.merge)
+	app.connect("env-merge-info", env_merge_info)
+	app.connect("env-updated", env_updated)
+	app.connect("missing-reference", _offline.missing_reference)
+	app.add_config_value("highlights_inventories", {}, "env", types=[dict])
+	app.add_config_value("highlights_stub_path", [], "env", types=[list])
+	app.add_config_value("highlights_unload_modules", False, "env", types=[bool])
+	app.add_config_value("highlights_keep_modules", [], "env", types=[list])
+	app.add_config_value("highlights_cache_dir", None, '', types=[str])
+	app.add_config_value("highlights_cache_max_size", 100, '', types=[int])
+	app.add_config_value("highlights_deferred", False, "env", types=[bool])
 
 	return {
 			"version": __version__,
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+#
+#  _cache.py
+"""
+Caches for the results of resolving highlights.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import hashlib
+import os
+import sys
+import sysconfig
+import traceback
+from importlib.machinery import PathFinder
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 3rd party
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+
+# this package
+from sphinx_highlights._highlight import Highlight
+
+__all__ = [
+		"CandidatePool",
+		"CandidatePoolIndex",
+		"FailureCache",
+		"HighlightCache",
+		"ResolutionFailure",
+		"candidate_pools",
+		"failure_cache",
+		"failure_sources",
+		"find_source",
+		"highlight_cache",
+		"source_fingerprint",
+		]
+
+Fingerprint = Optional[Tuple[str, int, int]]
+
+_stdlib_dir = os.path.normcase(os.path.abspath(sysconfig.get_paths()["stdlib"])) + os.sep
+_package_dir = os.path.normcase(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+class ResolutionFailure(NamedTuple):
+	"""
+	Records that an object could not be resolved.
+	"""
+
+	#: The exception type and message.
+	summary: str
+
+	#: The path, modification time and size of each source file involved.
+	fingerprint: Tuple[Fingerprint, ...]
+
+
+def find_source(app: Sphinx, obj_name: str) -> Optional[str]:
+	"""
+	Returns the file which the object with the given name is resolved from, without importing anything.
+
+	This is the local inventory for packages in :confval:`highlights_inventories`,
+	and otherwise the source of the most deeply nested module in the name which can be found.
+
+	:param app: The Sphinx application.
+	:param obj_name: The fully qualified name of the object.
+	"""
+
+	parts = obj_name.split('.')
+
+	if parts[0] in app.config.highlights_inventories:
+		return os.path.join(app.confdir, app.config.highlights_inventories[parts[0]][1])
+
+	origin = None
+	search_path = None
+
+	for idx in range(1, len(parts)):
+		spec = PathFinder.find_spec('.'.join(parts[:idx]), search_path)
+		if spec is None:
+			break
+
+		origin = spec.origin
+		search_path = spec.submodule_search_locations
+		if search_path is None:
+			break
+
+	return origin
+
+
+def source_fingerprint(app: Sphinx, obj_name: str) -> Fingerprint:
+	"""
+	Returns the path, modification time and size of the file the object with the given name is resolved from.
+
+	:param app: The Sphinx application.
+	:param obj_name: The fully qualified name of the object.
+	"""
+
+	filename = find_source(app, obj_name)
+	if filename is None:
+		return None
+
+	return _file_fingerprint(filename)
+
+
+def _file_fingerprint(filename: str) -> Fingerprint:
+	try:
+		stat = os.stat(filename)
+	except OSError:
+		return None
+
+	return filename, stat.st_mtime_ns, stat.st_size
+
+
+def _search_locations(module_name: str) -> List[str]:
+	# The directories a module would be found in, whose modification time changes when it is created or installed.
+	parent_name = module_name.rpartition('.')[0]
+
+	if parent_name:
+		return list(getattr(sys.modules.get(parent_name), "__path__", ()))
+	else:
+		return [entry or os.getcwd() for entry in sys.path]
+
+
+def failure_sources(
+		app: Sphinx,
+		obj_name: str,
+		exception: BaseException,
+		new_modules: Iterable[str] = (),
+		) -> List[str]:
+	"""
+	Returns the files which may be responsible for the object with the given name failing to resolve.
+
+	These are the file given by :func:`~.find_source`, the files of modules imported during the attempt,
+	and the files in the exception's traceback, except those in the standard library and this package.
+	If a module could not be found, the directories it would be found in are included instead.
+
+	:param app: The Sphinx application.
+	:param obj_name: The fully qualified name of the object.
+	:param exception: The exception raised when resolving the object.
+	:param new_modules: The names of the modules which were first imported while resolving the object.
+	"""
+
+	candidates = [find_source(app, obj_name)]
+
+	for name in sorted(new_modules):
+		candidates.append(getattr(sys.modules.get(name), "__file__", None))
+
+	if isinstance(exception, SyntaxError):
+		candidates.append(exception.filename)
+	elif isinstance(exception, ModuleNotFoundError) and exception.name:
+		candidates.extend(_search_locations(exception.name))
+
+	for frame, _ in traceback.walk_tb(exception.__traceback__):
+		candidates.append(frame.f_code.co_filename)
+
+	filenames: List[str] = []
+
+	for filename in candidates:
+		if not filename or filename in filenames or not os.path.exists(filename):
+			continue
+
+		# Neither the standard library nor this package are the cause of the failure.
+		normalised = os.path.normcase(os.path.abspath(filename))
+		if normalised.startswith(_package_dir):
+			continue
+		if normalised.startswith(_stdlib_dir) and "site-packages" not in normalised:
+			continue
+
+		filenames.append(filename)
+
+	return filenames
+
+
+class FailureCache:
+	"""
+	Remembers objects which could not be resolved, so they are only retried once their source changes.
+
+	The failures are stored on the build environment, and so persist between builds.
+
+	:param attr_name: The name of the build environment's attribute that stores the failures.
+	"""
+
+	def __init__(self, attr_name: str):
+		self.attr_name = str(attr_name)
+
+	def __repr__(self) -> str:
+		return f"{self.__class__.__name__}({self.attr_name!r})"
+
+	def get_failures(self, env: BuildEnvironment) -> Dict[str, ResolutionFailure]:
+		"""
+		Returns the mapping of object names to failures for the given environment.
+
+		:param env: The Sphinx build environment.
+		"""
+
+		if not hasattr(env, self.attr_name):
+			setattr(env, self.attr_name, {})
+
+		return getattr(env, self.attr_name)
+
+	def record(
+			self,
+			env: BuildEnvironment,
+			obj_name: str,
+			exception: Exception,
+			new_modules: Iterable[str] = (),
+			) -> ResolutionFailure:
+		"""
+		Record that the object with the given name could not be resolved.
+
+		The failure is fingerprinted with the files returned by :func:`~.failure_sources`.
+
+		:param env: The Sphinx build environment.
+		:param obj_name: The fully qualified name of the object.
+		:param exception: The exception raised when resolving the object.
+		:param new_modules: The names of the modules which were first imported while resolving the object.
+		"""
+
+		filenames = failure_sources(env.app, obj_name, exception, new_modules)
+
+		failure = ResolutionFailure(
+				summary=f"{type(exception).__name__}: {exception}",
+				fingerprint=tuple(map(_file_fingerprint, filenames)),
+				)
+		self.get_failures(env)[obj_name] = failure
+		return failure
+
+	def get(self, env: BuildEnvironment, obj_name: str) -> Optional[ResolutionFailure]:
+		"""
+		Returns the previous failure for the object with the given name,
+		or :py:obj:`None` if it has not failed or any of the files involved have changed since.
+
+		Failures which could not be attributed to any file are always retried.
+
+		:param env: The Sphinx build environment.
+		:param obj_name: The fully qualified name of the object.
+		"""  # noqa: D400
+
+		failures = self.get_failures(env)
+
+		if obj_name not in failures:
+			return None
+
+		failure = failures[obj_name]
+		filenames = [fingerprint[0] for fingerprint in failure.fingerprint if fingerprint is not None]
+
+		if not filenames or failure.fingerprint != tuple(map(_file_fingerprint, filenames)):
+			del failures[obj_name]
+			return None
+
+		return failure
+
+	def merge(self, app: Sphinx, env: BuildEnvironment, docnames: Set[str], other: BuildEnvironment) -> None:
+		"""
+		Merge the failures from a parallel read into the main environment.
+
+		This function can be configured for the :event:`env-merge-info` event.
+
+		:param app: The Sphinx application.
+		:param env: The Sphinx build environment.
+		:param docnames: The names of the documents read by the subprocess.
+		:param other: The build environment from the subprocess.
+		"""
+
+		self.get_failures(env).update(self.get_failures(other))
+
+
+failure_cache = FailureCache("sphinx_highlights_failures")
+
+
+class HighlightCache:
+	"""
+	In-process cache of the data extracted for each highlight,
+	so objects are only imported and introspected once per build process.
+
+	Entries are discarded if the source file of the object, or the file it is defined in, changes.
+	"""  # noqa: D400
+
+	def __init__(self):
+		self._highlights: Dict[str, Tuple[Fingerprint, Tuple[Fingerprint, ...], Highlight]] = {}
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} with {len(self._highlights)} entries>"
+
+	def __len__(self) -> int:
+		return len(self._highlights)
+
+	def get(self, app: Sphinx, obj_name: str) -> Optional[Highlight]:
+		"""
+		Returns the cached highlight for the object with the given name, if any.
+
+		:param app: The Sphinx application.
+		:param obj_name: The fully qualified name of the object.
+		"""
+
+		if obj_name not in self._highlights:
+			return None
+
+		fingerprint, defining_fingerprints, highlight = self._highlights[obj_name]
+		defining_files = [entry[0] for entry in defining_fingerprints if entry is not None]
+
+		if (
+				fingerprint != source_fingerprint(app, obj_name)
+				or defining_fingerprints != tuple(map(_file_fingerprint, defining_files))
+				):
+			del self._highlights[obj_name]
+			return None
+
+		return highlight
+
+	def add(self, app: Sphinx, highlight: Highlight, defining_files: Iterable[str] = ()) -> None:
+		"""
+		Add a highlight to the cache.
+
+		:param app: The Sphinx application.
+		:param highlight:
+		:param defining_files: The files the object is defined in, if different from its source file.
+		"""
+
+		self._highlights[highlight.name] = (
+				source_fingerprint(app, highlight.name),
+				tuple(map(_file_fingerprint, defining_files)),
+				highlight,
+				)
+
+	def clear(self) -> None:
+		"""
+		Remove all entries from the cache.
+		"""
+
+		self._highlights.clear()
+
+
+highlight_cache = HighlightCache()
+
+
+class CandidatePool:
+	"""
+	The candidate objects of one or more :rst:dir:`api-highlights` directives,
+	along with the highlights and failures resolved from them so far in the current build.
+
+	:param names: The fully qualified names of the objects.
+	"""  # noqa: D400
+
+	def __init__(self, names: Iterable[str]):
+		self.names: Tuple[str, ...] = tuple(names)
+
+		#: Mapping of object names to the highlights resolved from them.
+		self.highlights: Dict[str, Highlight] = {}
+
+		self._failures: Optional[Dict[str, ResolutionFailure]] = None
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} of {len(self.names)} objects>"
+
+	def get_failures(self, env: BuildEnvironment) -> Dict[str, ResolutionFailure]:
+		"""
+		Returns the mapping of object names to failures for objects in the pool.
+
+		The :data:`~.failure_cache` is only consulted the first time,
+		so failures found later must also be added to the returned mapping.
+
+		:param env: The Sphinx build environment.
+		"""
+
+		if self._failures is None:
+			self._failures = {}
+
+			for obj_name in self.names:
+				failure = failure_cache.get(env, obj_name)
+				if failure is not None:
+					self._failures[obj_name] = failure
+
+		return self._failures
+
+
+class CandidatePoolIndex:
+	"""
+	Interns the candidate pools of :rst:dir:`api-highlights` directives by their content,
+	so directives with the same objects share the work of filtering and resolving them.
+
+	The index must be cleared at the start of each build, as the pools are not invalidated if the source changes.
+	"""  # noqa: D400
+
+	def __init__(self):
+		self._pools: Dict[str, CandidatePool] = {}
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} with {len(self._pools)} pools>"
+
+	def __len__(self) -> int:
+		return len(self._pools)
+
+	def get(self, names: Iterable[str]) -> CandidatePool:
+		"""
+		Returns the pool for the given object names, creating it if necessary.
+
+		:param names: The fully qualified names of the objects, in the order they are sampled from.
+		"""
+
+		names = tuple(names)
+		key = hashlib.sha256('\n'.join(names).encode("UTF-8")).hexdigest()
+
+		if key not in self._pools:
+			self._pools[key] = CandidatePool(names)
+
+		return self._pools[key]
+
+	def clear(self) -> None:
+		"""
+		Remove all pools from the index.
+		"""
+
+		self._pools.clear()
+
+
+candidate_pools = CandidatePoolIndex()
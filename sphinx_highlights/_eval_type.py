@@ -38,8 +38,130 @@ if it can't resolve a string annotation.
 import contextlib
 import sys
 import typing
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
 
-__all__ = ["monkeypatcher"]
+__all__ = ["CacheInfo", "ForwardRefCache", "forward_ref_cache", "monkeypatcher"]
+
+
+class CacheInfo(NamedTuple):
+	"""
+	Statistics for a :class:`~.ForwardRefCache`.
+	"""
+
+	#: The number of lookups answered from the cache.
+	hits: int
+
+	#: The number of forward references which had to be evaluated.
+	misses: int
+
+	#: The number of lookups which raised an exception, whether from the cache or not.
+	failures: int
+
+	#: The number of entries in the cache.
+	currsize: int
+
+
+def _namespace_key(namespace: Optional[Dict[str, Any]]) -> Optional[Hashable]:
+	"""
+	Returns a key identifying the module the namespace belongs to, or :py:obj:`None` if it cannot be identified.
+
+	Class namespaces are passed as copies of the class' ``__dict__``, which doesn't record the class' qualified name,
+	so they are never identified.
+
+	:param namespace:
+	"""
+
+	if namespace is None:
+		return ()
+
+	if "__name__" in namespace and "__module__" not in namespace:
+		return namespace["__name__"]
+
+	return None
+
+
+class ForwardRefCache:
+	"""
+	Cache of the values of forward references, keyed on the string and the module they are evaluated in.
+
+	Failed lookups are cached too, so repeatedly evaluating an unresolvable
+	annotation costs a dictionary lookup rather than an :func:`eval`.
+	Forward references evaluated in namespaces which cannot be identified, such as those of classes, are not cached.
+	"""
+
+	def __init__(self):
+		self._values: Dict[Tuple, Tuple[bool, Any]] = {}
+		self._hits = self._misses = self._failures = 0
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} with {len(self._values)} entries>"
+
+	def __len__(self) -> int:
+		return len(self._values)
+
+	def evaluate(self, ref: typing.ForwardRef, globalns: Any, localns: Any, *args: Any) -> Any:
+		r"""
+		Evaluate the forward reference, or return the value from a previous evaluation.
+
+		:param ref:
+		:param globalns: The global namespace to evaluate the reference in.
+		:param localns: The local namespace to evaluate the reference in.
+		:param \*args: Additional arguments for :meth:`typing.ForwardRef._evaluate`.
+		"""
+
+		globals_key = _namespace_key(globalns)
+		locals_key = _namespace_key(localns)
+
+		if globals_key is None or locals_key is None:
+			return self._evaluate(ref, globalns, localns, *args)
+
+		key = (
+				ref.__forward_arg__,
+				ref.__forward_is_argument__,
+				getattr(ref, "__forward_is_class__", False),
+				getattr(ref, "__forward_module__", None),
+				globals_key,
+				locals_key,
+				*args,
+				)
+
+		if key in self._values:
+			self._hits += 1
+			success, value = self._values[key]
+		else:
+			try:
+				success, value = True, self._evaluate(ref, globalns, localns, *args)
+			except (NameError, TypeError, KeyError, AttributeError) as e:
+				success, value = False, e
+			self._values[key] = success, value
+
+		if success:
+			return value
+
+		self._failures += 1
+		raise value.with_traceback(None)
+
+	def _evaluate(self, ref: typing.ForwardRef, globalns: Any, localns: Any, *args: Any) -> Any:
+		self._misses += 1
+		return ref._evaluate(globalns, localns, *args)  # type: ignore[attr-defined]
+
+	def cache_info(self) -> CacheInfo:
+		"""
+		Returns the hit, miss and failure counts, and the current size of the cache.
+		"""
+
+		return CacheInfo(self._hits, self._misses, self._failures, len(self._values))
+
+	def clear(self) -> None:
+		"""
+		Remove all entries from the cache and reset the statistics.
+		"""
+
+		self._values.clear()
+		self._hits = self._misses = self._failures = 0
+
+
+forward_ref_cache = ForwardRefCache()
 
 if sys.version_info >= (3, 9):  # pragma: no cover (<py39)
 
@@ -53,7 +175,7 @@ if sys.version_info >= (3, 9):  # pragma: no cover (<py39)
 		"""
 
 		if isinstance(t, typing.ForwardRef):
-			return t._evaluate(globalns, localns, recursive_guard)
+			return forward_ref_cache.evaluate(t, globalns, localns, recursive_guard)
 
 		_genericalias = (typing._GenericAlias, typing.GenericAlias)  # type: ignore[attr-defined]  # noqa: TYP006
 		if isinstance(t, _genericalias):
@@ -89,7 +211,7 @@ else:  # pragma: no cover (py39+ or <py37)
 		"""
 
 		if isinstance(t, typing.ForwardRef):
-			return t._evaluate(globalns, localns)
+			return forward_ref_cache.evaluate(t, globalns, localns)
 
 		if isinstance(t, typing._GenericAlias):  # type: ignore[attr-defined]  # noqa: TYP006
 			ev_args_list = []
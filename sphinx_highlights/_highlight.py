@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+#  _highlight.py
+"""
+The data extracted for a single highlight, independent of how it was obtained.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import re
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+__all__ = ["Highlight", "format_title", "get_summary", "layout_signature"]
+
+# Google-style section headers, reStructuredText field lists and doctests.
+_section_header_re = re.compile(
+		r"^((Args|Arguments|Attributes|Examples?|Keyword Arg(ument)?s|Methods|Notes?|Other Parameters|"
+		r"Parameters|Raises|References|Returns?|See Also|Todo|Warnings?|Warns|Yields?)\s*:\s*$"
+		r"|:[^:\s][^:]*:(\s|$)|>>>)"
+		)
+
+# The underline of a numpydoc section header.
+_section_underline_re = re.compile(r"^(-{3,}|={3,})$")
+
+
+class Highlight(NamedTuple):
+	"""
+	The reStructuredText fragments which make up a single highlight.
+	"""
+
+	#: The fully qualified name of the object.
+	name: str
+
+	#: The cross-reference to the object, used as the heading.
+	title: str
+
+	#: The name of the module containing the object.
+	module: str
+
+	#: The lines of the ``parsed-literal`` block showing the object's signature.
+	signature: List[str]
+
+	#: The first paragraph of the object's docstring.
+	summary: str
+
+
+def format_title(obj_name: str, kind: str) -> str:
+	"""
+	Format the cross-reference to the object with the given name.
+
+	:param obj_name: The fully qualified name of the object.
+	:param kind: The kind of object. One of ``'function'``, ``'class'`` or ``'object'``.
+	"""
+
+	display_name = '.'.join(obj_name.split('.')[1:])
+
+	if kind == "function":
+		return f":func:`{display_name}() <.{obj_name}>`"
+	elif kind == "class":
+		return f":class:`{display_name} <.{obj_name}>`"
+	else:
+		return f":py:obj:`{display_name} <.{obj_name}>`"
+
+
+def layout_signature(name: str, arguments: Sequence[str], return_annotation: str = '') -> List[str]:
+	"""
+	Lay out a signature as a ``parsed-literal`` block, wrapping it onto multiple lines if it is too long.
+
+	:param name: The name of the object.
+	:param arguments: The formatted parameters.
+	:param return_annotation: The formatted return annotation, if any.
+
+	:return: A list of reStructuredText lines.
+	"""
+
+	if return_annotation:
+		closing = f") -> {return_annotation}"
+	else:
+		closing = ')'
+
+	lines = [".. parsed-literal::", '']
+
+	if len(name) + len(closing) + sum(map(len, arguments)) <= 60:
+		lines.append(f"    {name}({', '.join(arguments)}{closing}")
+	else:
+		lines.append(f"    {name}(")
+		# Without any arguments the trailing comma is still written on its own line.
+		lines.extend([f"      {argument}," for argument in arguments] or ["      ,"])
+		lines.append(f"      {closing}")
+
+	return lines
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+	start = 0
+
+	while True:
+		end = text.find('\n', start)
+		if end == -1:
+			yield text[start:]
+			return
+
+		yield text[start:end]
+		start = end + 1
+
+
+def get_summary(docstring: Optional[str]) -> str:
+	"""
+	Returns the first paragraph of ``docstring``.
+
+	The paragraph ends at the first blank line, or at the start of a numpydoc or Google-style section,
+	a field list (e.g. ``:param foo:``) or a doctest. The rest of the docstring is not processed.
+
+	.. versionadded:: 0.7.0
+
+	:param docstring:
+	"""
+
+	lines: List[str] = []
+	starts_on_first_line = False
+
+	for lineno, line in enumerate(_iter_lines(docstring or '')):
+		stripped = line.strip()
+
+		if not stripped:
+			if lines:
+				break
+			continue
+
+		if lines and _section_underline_re.match(stripped):
+			# The previous line was a numpydoc section header.
+			lines.pop()
+			break
+
+		if _section_header_re.match(stripped):
+			break
+
+		if not lines:
+			starts_on_first_line = lineno == 0
+
+		lines.append(line.expandtabs())
+
+	if not lines:
+		return ''
+
+	# Dedent in the same way as inspect.cleandoc, where the first line's indentation is ignored.
+	if starts_on_first_line:
+		first_line, *rest = lines
+		lines = [first_line.lstrip()]
+	else:
+		rest = lines
+		lines = []
+
+	if rest:
+		margin = min(len(line) - len(line.lstrip()) for line in rest)
+		lines.extend(line[margin:] for line in rest)
+
+	return '\n'.join(line.rstrip() for line in lines)
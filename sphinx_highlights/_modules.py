@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+#
+#  _modules.py
+"""
+Unload modules which were only imported to render highlights.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import os
+import re
+import sys
+import sysconfig
+from importlib import import_module
+from types import ModuleType
+from typing import Iterable, Iterator, List, Set
+
+# 3rd party
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+
+# this package
+from sphinx_highlights._eval_type import forward_ref_cache
+
+__all__ = ["find_autodoc_packages", "import_scope", "unload_modules"]
+
+# Imported on first use to format the highlights, and so must be loaded before the scope starts.
+_formatting_modules = ("sphinx_toolbox.more_autodoc.typehints", "sphinxcontrib.default_values")
+
+# The argument of ``.. automodule::``, ``.. autoclass::`` etc.
+_autodoc_directive_re = re.compile(r"^[ \t]*\.\. auto[a-z]+::[ \t]+([\w.]+)", re.MULTILINE)
+
+_stdlib_dir = os.path.normcase(os.path.abspath(sysconfig.get_paths()["stdlib"]))
+
+
+def _is_stdlib(module: ModuleType) -> bool:
+	filename = getattr(module, "__file__", None)
+
+	if not filename:
+		# Builtin and namespace modules
+		return not hasattr(module, "__path__")
+
+	filename = os.path.normcase(os.path.abspath(filename))
+	return filename.startswith(_stdlib_dir) and "site-packages" not in filename
+
+
+def _matches(name: str, prefixes: Iterable[str]) -> bool:
+	return any(name == prefix or name.startswith(f"{prefix}.") for prefix in prefixes)
+
+
+def unload_modules(names: Iterable[str], keep: Iterable[str] = ()) -> List[str]:
+	"""
+	Remove the given modules from :py:data:`sys.modules` and from the attributes of their parent packages.
+
+	The standard library, and modules matching ``keep``, are never removed.
+	Cached forward references are discarded, as they may refer to objects in the removed modules.
+
+	:param names: The names of the modules to remove.
+	:param keep: Names of modules which should remain loaded, along with their submodules.
+
+	:returns: The names of the modules which were removed.
+	"""
+
+	keep = list(keep)
+	unloaded = []
+
+	for name in sorted(names, reverse=True):
+		module = sys.modules.get(name)
+
+		if module is None or _matches(name, keep) or _is_stdlib(module):
+			continue
+
+		del sys.modules[name]
+		unloaded.append(name)
+
+		parent_name, _, child_name = name.rpartition('.')
+		parent = sys.modules.get(parent_name)
+		if parent is not None and getattr(parent, child_name, None) is module:
+			delattr(parent, child_name)
+
+	if unloaded:
+		forward_ref_cache.clear()
+
+	return unloaded
+
+
+def find_autodoc_packages(env: BuildEnvironment) -> List[str]:
+	"""
+	Returns the top-level packages of the objects documented with autodoc directives in the project's sources.
+
+	These must not be removed by :func:`~.unload_modules`, as autodoc may import them later in the build
+	and would then find two copies of the objects imported for highlights.
+
+	:param env: The Sphinx build environment.
+	"""
+
+	packages: Set[str] = set()
+
+	for docname in env.found_docs:
+		try:
+			with open(env.doc2path(docname), encoding=env.config.source_encoding) as fp:
+				source = fp.read()
+		except (OSError, UnicodeDecodeError):
+			continue
+
+		for match in _autodoc_directive_re.finditer(source):
+			packages.add(match.group(1).split('.')[0])
+
+	return sorted(packages)
+
+
+@contextlib.contextmanager
+def import_scope(app: Sphinx) -> Iterator[None]:
+	"""
+	Unload any modules imported within the :keyword:`with` block
+	if :confval:`highlights_unload_modules` is enabled.
+
+	Modules which were already loaded, modules of Sphinx extensions, packages documented with autodoc
+	(see :func:`~.find_autodoc_packages`) and those listed in :confval:`highlights_keep_modules` remain loaded.
+
+	:param app: The Sphinx application.
+	"""  # noqa: D400
+
+	if not app.config.highlights_unload_modules:
+		yield
+		return
+
+	for name in _formatting_modules:
+		import_module(name)
+
+	before: Set[str] = set(sys.modules)
+
+	try:
+		yield
+	finally:
+		keep = [
+				*app.config.highlights_keep_modules,
+				*app.extensions,
+				*getattr(app.env, "sphinx_highlights_autodoc_packages", ()),
+				]
+		unload_modules(set(sys.modules) - before, keep)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+#
+#  _offline.py
+"""
+Resolve highlights from a local ``objects.inv`` and ``.pyi`` stubs, without importing the library.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import ast
+import os
+import posixpath
+import re
+import sys
+import zlib
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+# 3rd party
+from docutils import nodes
+from sphinx.addnodes import pending_xref
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+from sphinx.util.inventory import InventoryFile
+from sphinx.util.typing import Inventory
+
+# this package
+from sphinx_highlights._highlight import Highlight, format_title, get_summary, layout_signature
+
+__all__ = ["load_inventory", "missing_reference", "resolve"]
+
+_Definition = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.AnnAssign]
+
+# Mapping of filenames to their modification time and parsed contents.
+_inventory_cache: Dict[str, Tuple[int, Inventory]] = {}
+_stub_cache: Dict[str, Tuple[int, str, ast.Module]] = {}
+
+# Packages whose inventory could not be read when resolving a reference, which have been warned about.
+_unreadable_inventories: Set[str] = set()
+
+logger = logging.getLogger(__name__)
+
+_objtype_kinds = {
+		"py:function": "function",
+		"py:method": "function",
+		"py:classmethod": "function",
+		"py:staticmethod": "function",
+		"py:class": "class",
+		"py:exception": "class",
+		}
+
+_escape_re = re.compile(r"([\\`*_|])")
+
+
+def _escape(text: str) -> str:
+	return _escape_re.sub(r"\\\1", text)
+
+
+def _read_cached(filename: str, cache: Dict, loader: Callable[[str], Tuple]) -> Tuple:
+	mtime = os.stat(filename).st_mtime_ns
+
+	if filename not in cache or cache[filename][0] != mtime:
+		cache[filename] = (mtime, *loader(filename))
+
+	return cache[filename][1:]
+
+
+def _load_inventory_file(base_uri: str) -> Callable[[str], Tuple[Inventory]]:
+
+	def loader(filename: str) -> Tuple[Inventory]:
+		with open(filename, "rb") as fp:
+			return (InventoryFile.load(fp, base_uri, posixpath.join), )
+
+	return loader
+
+
+def _load_stub_file(filename: str) -> Tuple[str, ast.Module]:
+	with open(filename, encoding="UTF-8") as fp:
+		source = fp.read()
+
+	return source, ast.parse(source, filename)
+
+
+def load_inventory(app: Sphinx, package: str) -> Optional[Inventory]:
+	"""
+	Load the local inventory configured for ``package`` in :confval:`highlights_inventories`.
+
+	:param app: The Sphinx application.
+	:param package: The name of the top-level package.
+
+	:returns: The inventory, or :py:obj:`None` if the package should be imported as normal.
+	"""
+
+	if package not in app.config.highlights_inventories:
+		return None
+
+	base_uri, inventory_file = app.config.highlights_inventories[package]
+	filename = os.path.join(app.confdir, inventory_file)
+
+	return _read_cached(filename, _inventory_cache, _load_inventory_file(base_uri))[0]
+
+
+def _find_stub(stub_dirs: List[str], module_name: str) -> Optional[str]:
+	parts = module_name.split('.')
+
+	for directory in stub_dirs:
+		# Both ``package/module.pyi`` and typeshed-style ``package-stubs/module.pyi`` layouts.
+		for top_level in (parts[0], f"{parts[0]}-stubs"):
+			base = os.path.join(directory, top_level, *parts[1:])
+
+			for filename in (f"{base}.pyi", os.path.join(base, "__init__.pyi")):
+				if os.path.isfile(filename):
+					return filename
+
+	return None
+
+
+def _find_member(node: ast.AST, name: str) -> Optional[_Definition]:
+	for child in getattr(node, "body", ()):
+		if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and child.name == name:
+			return child
+		elif isinstance(child, ast.AnnAssign) and isinstance(child.target, ast.Name) and child.target.id == name:
+			return child
+
+	return None
+
+
+def _find_definition(stub_dirs: List[str], obj_name: str) -> Optional[Tuple[_Definition, str]]:
+	parts = obj_name.split('.')
+
+	# The module may be any prefix of the name, with the remainder being (possibly nested) class members.
+	for split in range(len(parts) - 1, 0, -1):
+		filename = _find_stub(stub_dirs, '.'.join(parts[:split]))
+		if filename is None:
+			continue
+
+		source, tree = _read_cached(filename, _stub_cache, _load_stub_file)
+		node: Optional[ast.AST] = tree
+
+		for attr in parts[split:]:
+			node = _find_member(node, attr)
+			if node is None:
+				break
+		else:
+			return node, source  # type: ignore[return-value]
+
+	return None
+
+
+def _unparse(node: ast.AST, source: str) -> str:
+	if sys.version_info >= (3, 9):  # pragma: no cover (<py39)
+		return ast.unparse(node)
+	elif sys.version_info >= (3, 8):  # pragma: no cover (!py38)
+		return ast.get_source_segment(source, node) or ''
+	else:  # pragma: no cover (py38+)
+		# End positions aren't recorded before Python 3.8
+		return ''
+
+
+def _format_stub_parameter(arg: ast.arg, default: Optional[ast.AST], source: str, prefix: str = '') -> str:
+	formatted = arg.arg
+
+	if arg.annotation is not None:
+		annotation = _unparse(arg.annotation, source)
+		if annotation:
+			formatted = f"{formatted}: {_escape(annotation)}"
+
+	if default is not None:
+		formatted = f"{formatted} = {_escape(_unparse(default, source) or '...')}"
+
+	return f"{prefix}{formatted}"
+
+
+def _format_stub_arguments(args: ast.arguments, source: str) -> List[str]:
+	formatted = []
+
+	positional = [*getattr(args, "posonlyargs", ()), *args.args]
+	defaults: List[Optional[ast.AST]] = [None] * (len(positional) - len(args.defaults))
+	defaults.extend(args.defaults)
+
+	for arg, default in zip(positional, defaults):
+		formatted.append(_format_stub_parameter(arg, default, source))
+
+	if args.vararg is not None:
+		formatted.append(_format_stub_parameter(args.vararg, None, source, prefix=r"\*"))
+
+	for arg, kw_default in zip(args.kwonlyargs, args.kw_defaults):
+		formatted.append(_format_stub_parameter(arg, kw_default, source))
+
+	if args.kwarg is not None:
+		formatted.append(_format_stub_parameter(args.kwarg, None, source, prefix=r"\*\*"))
+
+	return formatted
+
+
+def _format_stub_signature(node: _Definition, source: str) -> List[str]:
+	if isinstance(node, ast.ClassDef):
+		init = _find_member(node, "__init__")
+		if isinstance(init, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			arguments = _format_stub_arguments(init.args, source)[1:]
+		else:
+			arguments = []
+
+		return layout_signature(node.name, arguments)
+
+	elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+		return_annotation = _unparse(node.returns, source) if node.returns is not None else ''
+		return layout_signature(node.name, _format_stub_arguments(node.args, source), _escape(return_annotation))
+
+	return []
+
+
+def _get_stub_dirs(app: Sphinx) -> List[str]:
+	return [os.path.join(app.confdir, directory) for directory in app.config.highlights_stub_path]
+
+
+def _lookup(inventory: Inventory, obj_name: str) -> Optional[str]:
+	for objtype, objects in inventory.items():
+		if objtype.startswith("py:") and obj_name in objects:
+			return objtype
+
+	return None
+
+
+def resolve(app: Sphinx, obj_name: str) -> Optional[Highlight]:
+	"""
+	Resolve the object with the given name from the local inventory and stubs for its package.
+
+	:param app: The Sphinx application.
+	:param obj_name: The fully qualified name of the object.
+
+	:returns: The highlight, or :py:obj:`None` if the object's package should be imported as normal.
+	"""
+
+	inventory = load_inventory(app, obj_name.split('.')[0])
+	if inventory is None:
+		return None
+
+	objtype = _lookup(inventory, obj_name)
+	definition = _find_definition(_get_stub_dirs(app), obj_name)
+
+	if objtype is None and definition is None:
+		raise LookupError(f"{obj_name!r} was not found in the inventory or stubs for its package.")
+
+	if objtype is not None:
+		kind = _objtype_kinds.get(objtype, "object")
+	elif isinstance(definition[0], ast.ClassDef):  # type: ignore[index]
+		kind = "class"
+	elif isinstance(definition[0], (ast.FunctionDef, ast.AsyncFunctionDef)):  # type: ignore[index]
+		kind = "function"
+	else:
+		kind = "object"
+
+	signature: List[str] = []
+	summary = ''
+
+	if definition is not None:
+		node, source = definition
+		signature = _format_stub_signature(node, source)
+
+		if not isinstance(node, ast.AnnAssign):
+			summary = get_summary(ast.get_docstring(node, clean=False))
+
+	return Highlight(
+			name=obj_name,
+			title=format_title(obj_name, kind),
+			module='.'.join(obj_name.split('.')[:-1]),
+			signature=signature,
+			summary=summary,
+			)
+
+
+def missing_reference(
+		app: Sphinx,
+		env: BuildEnvironment,
+		node: pending_xref,
+		contnode: nodes.TextElement,
+		) -> Optional[nodes.reference]:
+	"""
+	Resolve references to objects in the packages configured in :confval:`highlights_inventories`.
+
+	If the inventory cannot be read a warning is emitted, once per package, and the reference is left unresolved.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	:param node: The :class:`~sphinx.addnodes.pending_xref` node to be resolved.
+	:param contnode: The node that carries the text and formatting inside the future reference.
+	"""
+
+	if node.get("refdomain") != "py":
+		return None
+
+	target = node["reftarget"]
+	package = target.split('.')[0]
+
+	try:
+		inventory = load_inventory(app, package)
+	except (OSError, ValueError, zlib.error) as e:
+		if package not in _unreadable_inventories:
+			logger.warning(f"Unable to read the inventory for {package!r}: {e}", location=node)
+			_unreadable_inventories.add(package)
+		return None
+
+	if inventory is None:
+		return None
+
+	for objtype in env.get_domain("py").objtypes_for_role(node["reftype"]) or ():
+		objects = inventory.get(f"py:{objtype}", {})
+		if target in objects:
+			project, version, uri, _ = objects[target]
+			reftitle = f"(in {project} v{version})" if version else f"(in {project})"
+			reference = nodes.reference('', '', internal=False, refuri=uri, reftitle=reftitle)
+			reference.append(contnode)
+			return reference
+
+	return None
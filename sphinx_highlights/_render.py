@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+#
+#  _render.py
+"""
+Writers which lay out a set of highlights as reStructuredText.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Type
+
+# 3rd party
+from docutils import nodes
+
+# this package
+from sphinx_highlights._highlight import Highlight
+
+__all__ = ["BulletListWriter", "HighlightsWriter", "PanelsWriter"]
+
+
+class HighlightsWriter(ABC):
+	"""
+	Writes the reStructuredText for a set of highlights into a single list of lines.
+
+	Each highlight's title, signature, summary and footer are written in one pass;
+	subclasses provide the layout around them.
+
+	.. versionadded:: 0.7.0
+	"""
+
+	#: The node the output is parsed into.
+	node_class: Type[nodes.Element] = nodes.container
+
+	#: The indentation of the content of each highlight.
+	indent: str = ''
+
+	def __init__(self):
+		self.lines: List[str] = []
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__}>"
+
+	def write(self, text: str = '', indent: Optional[str] = None) -> None:
+		"""
+		Write a line of text, which may contain newlines.
+
+		:param text:
+		:param indent: The indentation for the line. Defaults to :attr:`~.HighlightsWriter.indent`.
+		"""
+
+		if indent is None:
+			indent = self.indent
+
+		for line in text.split('\n'):
+			self.lines.append(f"{indent}{line}".rstrip())
+
+	def write_header(self) -> None:
+		"""
+		Write the lines before the first highlight.
+		"""
+
+	@abstractmethod
+	def write_title(self, highlight: Highlight, first: bool) -> None:
+		"""
+		Write the lines before the signature of the highlight.
+
+		:param highlight:
+		:param first: Whether this is the first highlight.
+		"""
+
+	def write_footer(self, highlight: Highlight) -> None:
+		"""
+		Write the lines after the summary of the highlight.
+
+		:param highlight:
+		"""
+
+	def render(self, highlights: Iterable[Highlight]) -> List[str]:
+		"""
+		Returns the reStructuredText for the given highlights.
+
+		:param highlights:
+		"""
+
+		self.lines = []
+		self.write_header()
+
+		for idx, highlight in enumerate(highlights):
+			self.write_title(highlight, first=not idx)
+			self.lines.append('')
+			for line in highlight.signature:
+				self.write(line)
+			self.lines.append('')
+			self.write(highlight.summary)
+			self.lines.append('')
+			self.write_footer(highlight)
+
+		return self.lines
+
+
+class PanelsWriter(HighlightsWriter):
+	"""
+	Writes the highlights as a grid of :rst:dir:`panels`, for ``HTML`` builders.
+
+	.. versionadded:: 0.7.0
+
+	:param colours: Iterator of colour names to use for each panel in turn.
+	:param classes: CSS classes for each panel's column.
+	"""
+
+	node_class = nodes.paragraph
+	indent = "    "
+
+	def __init__(self, colours: Iterator[str], classes: Iterable[str]):
+		super().__init__()
+		self.colours = colours
+		self.classes = list(classes)
+
+	def write_header(self) -> None:  # noqa: D102
+		self.lines.append(".. panels::")
+		self.write(":container: container-xl pb-4 sphinx-highlights")
+		self.lines.append('')
+
+	def write_title(self, highlight: Highlight, first: bool) -> None:  # noqa: D102
+		if not first:
+			self.write("---")
+
+		self.write(f":column: {' '.join([*self.classes, f'highlight-{next(self.colours)}'])}")
+		self.write(highlight.title)
+		self.write('^' * (len(self.indent) + len(highlight.title)))
+
+	def write_footer(self, highlight: Highlight) -> None:  # noqa: D102
+		self.write(f"See more in :mod:`{highlight.module}`.")
+
+
+class BulletListWriter(HighlightsWriter):
+	"""
+	Writes the highlights as a bullet list, for other builders.
+
+	.. versionadded:: 0.7.0
+	"""
+
+	indent = "  "
+
+	def write_title(self, highlight: Highlight, first: bool) -> None:  # noqa: D102
+		self.write(f"* {highlight.title}", indent='')
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+#
+#  _shared_cache.py
+"""
+On-disk cache of highlights which can be shared by concurrent ``sphinx-build`` processes.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+# this package
+from sphinx_highlights._highlight import Highlight
+
+__all__ = [
+		"SharedCache",
+		"SharedCacheEntry",
+		"dependency_versions",
+		"evict_shared_cache",
+		"file_hash",
+		"get_shared_cache",
+		]
+
+# Mapping of (filename, mtime, size) to the SHA-256 of the file's contents.
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+# Mapping of (directory, max_size) to cache instances, or None if the directory could not be created.
+_shared_caches: Dict[Tuple[str, int], Optional["SharedCache"]] = {}
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(filename: str) -> str:
+	"""
+	Returns the SHA-256 hash of the contents of the given file.
+
+	Hashes are cached in-process until the file's modification time or size changes.
+
+	:param filename:
+	"""
+
+	stat = os.stat(filename)
+	key = (filename, stat.st_mtime_ns, stat.st_size)
+
+	if key not in _file_hashes:
+		with open(filename, "rb") as fp:
+			_file_hashes[key] = hashlib.sha256(fp.read()).hexdigest()
+
+	return _file_hashes[key]
+
+
+@functools.lru_cache()
+def dependency_versions() -> Tuple[str, ...]:
+	"""
+	Returns the versions of Python and the libraries which affect how highlights are formatted.
+	"""
+
+	# 3rd party
+	import docutils
+	import sphinx
+	import sphinx_toolbox
+	import sphinxcontrib.default_values
+
+	# this package
+	from sphinx_highlights import __version__
+
+	return (
+			f"python-{sys.implementation.name}-{sys.version_info[0]}.{sys.version_info[1]}",
+			f"sphinx-highlights-{__version__}",
+			f"sphinx-{sphinx.__version__}",
+			f"sphinx-toolbox-{sphinx_toolbox.__version__}",
+			f"default-values-{getattr(sphinxcontrib.default_values, '__version__', '')}",
+			f"docutils-{docutils.__version__}",
+			)
+
+
+class SharedCacheEntry(NamedTuple):
+	"""
+	A highlight read from a :class:`~.SharedCache`.
+	"""
+
+	highlight: Highlight
+
+	#: The files the object is defined in, if different from the one used for the key.
+	source_files: List[str]
+
+
+@contextlib.contextmanager
+def _lock(directory: str) -> Iterator[None]:
+	with open(os.path.join(directory, ".lock"), "a+b") as fp:
+		if sys.platform == "win32":  # pragma: no cover (!Windows)
+			# stdlib
+			import msvcrt
+
+			fp.seek(0)
+			msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+			try:
+				yield
+			finally:
+				fp.seek(0)
+				msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+		else:  # pragma: no cover (Windows)
+			# stdlib
+			import fcntl
+
+			fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+class SharedCache:
+	"""
+	A directory of highlights, content-addressed by the object's name,
+	the hash of its source file and the versions of the formatting dependencies.
+
+	Each entry also records the hashes of the files the object was found to be defined in,
+	which may differ from the file its name points to if it is re-exported,
+	and is ignored if any of them have changed.
+
+	Entries are written atomically, and evicted in least recently used order once
+	the total size exceeds ``max_size``. Writes and eviction are serialised with a
+	lock file so several processes can use the same directory.
+	Errors writing to the directory are logged once, after which the cache behaves as if it were empty.
+
+	:param directory:
+	:param max_size: The maximum total size of the cache, in bytes.
+	"""  # noqa: D400
+
+	def __init__(self, directory: str, max_size: int):
+		self.directory = os.path.abspath(directory)
+		self.max_size = max_size
+		self._warned = False
+		os.makedirs(self.directory, exist_ok=True)
+
+	def __repr__(self) -> str:
+		return f"{self.__class__.__name__}({self.directory!r}, max_size={self.max_size!r})"
+
+	@staticmethod
+	def key(obj_name: str, source_file: str) -> str:
+		"""
+		Returns the key for the object with the given name.
+
+		:param obj_name: The fully qualified name of the object.
+		:param source_file: The file the object is defined in.
+		"""
+
+		key_data = json.dumps([obj_name, file_hash(source_file), *dependency_versions()])
+		return hashlib.sha256(key_data.encode("UTF-8")).hexdigest()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.directory, key[:2], f"{key}.json")
+
+	def _warn(self, exception: OSError) -> None:
+		if not self._warned:
+			logger.warning(f"Unable to use the highlights cache in {self.directory!r}: {exception}")
+			self._warned = True
+
+	def get(self, key: str) -> Optional[SharedCacheEntry]:
+		"""
+		Returns the highlight with the given key and the files it was defined in,
+		or :py:obj:`None` if it isn't in the cache.
+
+		:param key:
+		"""  # noqa: D400
+
+		filename = self._path(key)
+
+		try:
+			with open(filename, encoding="UTF-8") as fp:
+				entry = json.load(fp)
+
+			highlight = Highlight(**entry["highlight"])
+
+			for source_file, source_hash in entry["sources"].items():
+				if file_hash(source_file) != source_hash:
+					return None
+
+		except (OSError, ValueError, TypeError, KeyError, AttributeError):
+			return None
+
+		with contextlib.suppress(OSError):
+			# Mark as recently used.
+			os.utime(filename)
+
+		return SharedCacheEntry(highlight, list(entry["sources"]))
+
+	def put(self, key: str, highlight: Highlight, source_files: Iterable[str] = ()) -> None:
+		"""
+		Add a highlight to the cache.
+
+		:param key:
+		:param highlight:
+		:param source_files: The files the object is defined in, if different from the one used for the key.
+		"""
+
+		filename = self._path(key)
+
+		try:
+			entry = {
+					"highlight": highlight._asdict(),
+					"sources": {source_file: file_hash(source_file) for source_file in source_files},
+					}
+
+			os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+			with _lock(self.directory):
+				fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename), suffix=".tmp")
+				try:
+					with os.fdopen(fd, 'w', encoding="UTF-8") as fp:
+						json.dump(entry, fp)
+					os.replace(tmp_filename, filename)
+				except BaseException:
+					with contextlib.suppress(OSError):
+						os.unlink(tmp_filename)
+					raise
+
+		except OSError as e:
+			self._warn(e)
+
+	def evict(self) -> List[str]:
+		"""
+		Remove the least recently used entries until the cache is no larger than ``max_size``.
+
+		:returns: The keys of the entries which were removed.
+		"""
+
+		evicted: List[str] = []
+
+		try:
+			with _lock(self.directory):
+				entries = []
+				for dirpath, _, filenames in os.walk(self.directory):
+					for filename in filenames:
+						if filename.endswith(".json"):
+							path = os.path.join(dirpath, filename)
+							with contextlib.suppress(OSError):
+								stat = os.stat(path)
+								entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+				total_size = sum(size for _, size, _ in entries)
+
+				for _, size, path in sorted(entries):
+					if total_size <= self.max_size:
+						break
+
+					with contextlib.suppress(OSError):
+						os.unlink(path)
+						total_size -= size
+						evicted.append(os.path.basename(path)[:-5])
+
+		except OSError as e:
+			self._warn(e)
+
+		return evicted
+
+
+def get_shared_cache(app: Sphinx) -> Optional[SharedCache]:
+	"""
+	Returns the cache in :confval:`highlights_cache_dir`,
+	or :py:obj:`None` if it isn't configured or the directory can't be created.
+
+	:param app: The Sphinx application.
+	"""
+
+	if not app.config.highlights_cache_dir:
+		return None
+
+	directory = os.path.join(app.confdir, app.config.highlights_cache_dir)
+	max_size = app.config.highlights_cache_max_size * 1024 * 1024
+
+	if (directory, max_size) not in _shared_caches:
+		try:
+			_shared_caches[(directory, max_size)] = SharedCache(directory, max_size)
+		except OSError as e:
+			logger.warning(f"Unable to use the highlights cache in {directory!r}: {e}")
+			_shared_caches[(directory, max_size)] = None
+
+	return _shared_caches[(directory, max_size)]
+
+
+def evict_shared_cache(app: Sphinx, exception: Optional[Exception] = None) -> None:
+	"""
+	Trim the cache in :confval:`highlights_cache_dir` to :confval:`highlights_cache_max_size` at the end of the build.
+
+	:param app: The Sphinx application.
+	:param exception: Any exception which occurred and caused Sphinx to abort.
+	"""
+
+	shared_cache = get_shared_cache(app)
+	if shared_cache is not None:
+		shared_cache.evict()
@@ -0,0 +1,96 @@
+# stdlib
+import sys
+import typing
+from types import ModuleType
+from typing import List, Optional, get_type_hints
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from sphinx_highlights._eval_type import forward_ref_cache, monkeypatcher
+from sphinx_highlights._modules import unload_modules
+
+
+def _resolvable(a: "List[ModuleType]", b: "Optional[List[ModuleType]]" = None) -> "ModuleType": ...
+
+
+def _unresolvable(a: "List[Undefined]", b: "Optional[List[Undefined]]" = None) -> None: ...  # type: ignore[name-defined]  # noqa: F821
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+	forward_ref_cache.clear()
+	yield
+	forward_ref_cache.clear()
+
+
+def test_cache_hits():
+	with monkeypatcher():
+		first = get_type_hints(_resolvable)
+		info = forward_ref_cache.cache_info()
+		assert info.hits == 0
+		assert info.misses == info.currsize == 3
+
+		assert get_type_hints(_resolvable) == first
+		assert forward_ref_cache.cache_info().hits == 3
+		assert forward_ref_cache.cache_info().misses == 3
+
+	assert first == {"a": List[ModuleType], "b": Optional[List[ModuleType]], "return": ModuleType}
+
+
+def test_cache_failures():
+	with monkeypatcher():
+		with pytest.raises(NameError, match="Undefined"):
+			get_type_hints(_unresolvable)
+
+		misses = forward_ref_cache.cache_info().misses
+
+		with pytest.raises(NameError, match="Undefined"):
+			get_type_hints(_unresolvable)
+
+	info = forward_ref_cache.cache_info()
+	assert info.misses == misses
+	assert info.hits == 1
+	assert info.failures == 2
+
+
+def test_class_namespaces_not_cached():
+
+	def make_class(value: type) -> type:
+
+		class Local:
+			attr: "Alias"  # type: ignore[name-defined]  # noqa: F821
+			Alias = value
+
+		return Local
+
+	with monkeypatcher():
+		assert get_type_hints(make_class(int))["attr"] is int
+		assert get_type_hints(make_class(str))["attr"] is str
+
+	assert forward_ref_cache.cache_info() == (0, 2, 0, 0)
+
+
+def test_cleared_on_unload(tmp_pathplus: PathPlus):
+	module = ModuleType("_sphinx_highlights_test_module")
+	module.__file__ = str(tmp_pathplus / "_sphinx_highlights_test_module.py")
+	exec('def func(a: "int") -> "str": ...', module.__dict__)  # pylint: disable=exec-used
+	sys.modules[module.__name__] = module
+
+	with monkeypatcher():
+		assert get_type_hints(module.func) == {"a": int, "return": str}  # type: ignore[attr-defined]
+
+	assert len(forward_ref_cache)
+	assert unload_modules([module.__name__]) == [module.__name__]
+	assert not len(forward_ref_cache)
+
+
+def test_original_restored():
+	original_eval_type = typing._eval_type  # type: ignore[attr-defined]  # noqa: TYP006
+
+	with monkeypatcher():
+		assert typing._eval_type is not original_eval_type  # type: ignore[attr-defined]  # noqa: TYP006
+
+	assert typing._eval_type is original_eval_type  # type: ignore[attr-defined]  # noqa: TYP006
@@ -0,0 +1,62 @@
+# stdlib
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+# 3rd party
+from coincidence.selectors import not_pypy
+
+# The time, in microseconds, importing sphinx_highlights may add on top of its unavoidable dependencies.
+import_time_budget = int(os.environ.get("SPHINX_HIGHLIGHTS_IMPORT_BUDGET", 75_000))
+
+# Loaded by Sphinx itself, or by ``setup()`` via ``sphinx_toolbox.tweaks.sphinx_panels_tabs``, regardless.
+prelude = "import sphinx.application, sphinx.environment, sphinx.util.docutils, sphinx_toolbox.utils"
+
+# Only needed once the directive is used or the build finishes.
+lazy_modules = {
+		"dict2css",
+		"domdf_python_tools.paths",
+		"sphinx_toolbox.more_autodoc.typehints",
+		"sphinxcontrib.default_values",
+		}
+
+_importtime_re = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(.*)")
+
+
+def _import_sphinx_highlights() -> List[Tuple[int, int, str]]:
+	"""
+	Returns the cumulative import time, depth and name of each module imported by ``sphinx_highlights``.
+	"""
+
+	process = subprocess.run(
+			[sys.executable, "-X", "importtime", "-c", f"{prelude}\nimport sphinx_highlights"],
+			stderr=subprocess.PIPE,
+			universal_newlines=True,
+			check=True,
+			)
+
+	entries = []
+	for line in process.stderr.splitlines():
+		m = _importtime_re.match(line)
+		if m is not None:
+			entries.append((int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+
+	# Child modules are listed before their parents, so everything imported by
+	# sphinx_highlights is listed between it and the previous top-level import.
+	end = next(idx for idx, entry in enumerate(entries) if entry[1:] == (0, "sphinx_highlights"))
+	start = end
+	while start and entries[start - 1][1]:
+		start -= 1
+
+	return entries[start:end + 1]
+
+
+@not_pypy("-X importtime is CPython only")
+def test_import_time():
+	entries = _import_sphinx_highlights()
+	imported = {name for _, _, name in entries}
+
+	assert not imported & lazy_modules
+	assert entries[-1][0] < import_time_budget, f"import took {entries[-1][0]:,}µs"
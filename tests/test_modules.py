@@ -0,0 +1,55 @@
+# stdlib
+import sys
+from types import SimpleNamespace
+
+# 3rd party
+import domdf_python_tools.utils
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from sphinx_highlights import _import_highlight
+from sphinx_highlights._modules import find_autodoc_packages, unload_modules
+
+
+def test_preserve_annotations():
+	original = domdf_python_tools.utils.head.__annotations__
+	_import_highlight("domdf_python_tools.utils.head", preserve_annotations=True)
+	assert domdf_python_tools.utils.head.__annotations__ is original
+
+
+def test_unload_modules(monkeypatch):
+	# 3rd party
+	import domdf_python_tools.words
+
+	monkeypatch.setitem(sys.modules, "domdf_python_tools.words", domdf_python_tools.words)
+	monkeypatch.setattr(domdf_python_tools, "words", domdf_python_tools.words)
+
+	names = ["domdf_python_tools.words", "domdf_python_tools.utils", "json"]
+	assert unload_modules(names, keep=["domdf_python_tools.utils"]) == ["domdf_python_tools.words"]
+
+	assert "domdf_python_tools.words" not in sys.modules
+	assert not hasattr(domdf_python_tools, "words")
+	assert "domdf_python_tools.utils" in sys.modules
+	assert "json" in sys.modules
+
+
+def test_find_autodoc_packages(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "index.rst").write_lines([
+			".. automodule:: domdf_python_tools.words",
+			"\t:members:",
+			'',
+			".. autoclass:: consolekit.terminal_colours.Fore",
+			'',
+			".. autosummary::",
+			'',
+			"\tignored.func",
+			])
+	(tmp_pathplus / "api.rst").write_text(".. autofunction:: sphinx_highlights.get_summary")
+
+	env = SimpleNamespace(
+			found_docs={"index", "api"},
+			doc2path=lambda docname: tmp_pathplus / f"{docname}.rst",
+			config=SimpleNamespace(source_encoding="utf-8-sig"),
+			)
+
+	assert find_autodoc_packages(env) == ["consolekit", "domdf_python_tools", "sphinx_highlights"]  # type: ignore[arg-type]
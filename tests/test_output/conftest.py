@@ -96,7 +96,7 @@ def app_params(
 
 	# ##### prepare Application params
 
-	testroot = "root"
+	testroot = kwargs.pop("testroot", "root")
 	kwargs["srcdir"] = srcdir = sphinx_test_tempdir / kwargs.get("srcdir", testroot)
 
 	# special support for sphinx/tests
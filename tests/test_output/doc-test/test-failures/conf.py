@@ -0,0 +1,3 @@
+extensions = ["sphinx_highlights"]
+
+project = "sphinx-highlights-failures"
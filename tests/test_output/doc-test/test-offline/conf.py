@@ -0,0 +1,6 @@
+extensions = ["sphinx_highlights"]
+
+project = "sphinx-highlights-offline"
+
+highlights_inventories = {"fakelib": ("https://fakelib.example.org/", "objects.inv")}
+highlights_stub_path = ["stubs"]
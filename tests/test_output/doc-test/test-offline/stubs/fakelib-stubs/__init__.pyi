@@ -0,0 +1 @@
+DEFAULT_SIZE: int
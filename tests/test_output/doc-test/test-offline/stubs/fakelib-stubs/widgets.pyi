@@ -0,0 +1,17 @@
+from typing import Dict, List, Optional
+
+class Widget:
+	"""
+	A widget which cannot be imported.
+
+	This paragraph is not part of the summary.
+	"""
+
+	def __init__(self, name: str, size: int = ..., *children: "Widget") -> None: ...
+
+def make_widget(name: str, *, parent: Optional[Widget] = None, **options: Dict[str, List[int]]) -> Widget:
+	"""
+	Construct a new :class:`~.Widget`.
+	"""
+
+class Gadget(Widget): ...
@@ -0,0 +1,9 @@
+# stdlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+extensions = ["sphinx_highlights"]
+
+project = "sphinx-highlights-reexport"
@@ -0,0 +1 @@
+from reexport_lib._impl import greet
@@ -0,0 +1,4 @@
+def welcome() -> str:
+	"""
+	Old summary.
+	"""
@@ -1,5 +1,8 @@
 # stdlib
+import importlib
 import random
+import sys
+from types import ModuleType
 from typing import Tuple, no_type_check
 
 # 3rd party
@@ -8,8 +11,13 @@ from bs4 import BeautifulSoup
 from domdf_python_tools.paths import PathPlus
 from domdf_python_tools.stringlist import StringList
 from sphinx.application import Sphinx
+from sphinx.util.console import strip_colors  # type: ignore[attr-defined]
 from sphinx_toolbox.testing import HTMLRegressionFixture, LaTeXRegressionFixture
 
+# this package
+import sphinx_highlights
+from sphinx_highlights._cache import candidate_pools, failure_cache, highlight_cache
+
 
 def test_build_example(app: Sphinx):
 	app.build()
@@ -34,6 +42,54 @@ def test_html_output(page: BeautifulSoup, html_regression: HTMLRegressionFixture
 	html_regression.check(page, jinja2=True, jinja2_namespace={"alabaster_version": _get_alabaster_version()})
 
 
+@pytest.mark.sphinx("html", srcdir="test-deferred", confoverrides={"highlights_deferred": True})
+@pytest.mark.parametrize("page", ["index.html"], indirect=True)
+def test_deferred_html_output(page: BeautifulSoup, html_regression: HTMLRegressionFixture):
+	# The same highlights are chosen when the document is written as when it is read.
+	html_regression.check(page, jinja2=True, jinja2_namespace={"alabaster_version": _get_alabaster_version()})
+
+
+@pytest.mark.sphinx("html", srcdir="test-deferred-rebuild", confoverrides={"highlights_deferred": True})
+def test_deferred_rebuild(app: Sphinx):
+	app.build()
+
+	doctree = app.env.get_doctree("index")
+	assert len(doctree.traverse(sphinx_highlights.highlights_placeholder)) == 1
+
+	app._status.seek(0)  # type: ignore[attr-defined]
+	app._status.truncate()  # type: ignore[attr-defined]
+	app.build()
+
+	# The highlights are chosen again without reading the document.
+	status = strip_colors(app._status.getvalue())  # type: ignore[attr-defined]
+	assert "reading sources" not in status
+	assert "writing output... [100%] index" in status
+
+	page = BeautifulSoup((PathPlus(app.outdir) / "index.html").read_text(), "html5lib")
+	assert len(page.select("div.sphinx-highlights div.card")) == 4
+
+
+@pytest.mark.sphinx(
+		"html",
+		srcdir="test-deferred-parallel",
+		testroot="parallel",
+		parallel=4,
+		confoverrides={"highlights_deferred": True},
+		)
+def test_deferred_parallel_rebuild(app: Sphinx):
+	app.build()
+
+	for _ in range(3):
+		# Enough documents to be read in parallel, but not those with highlights.
+		for page in PathPlus(app.srcdir).glob("page*.rst"):
+			page.write_text(page.read_text() + '\n')
+
+		app.build()
+
+		nodes = getattr(app.env, sphinx_highlights.deferred_highlights_purger.attr_name)
+		assert sorted(node["docname"] for node in nodes) == ["highlights", "index"]
+
+
 @pytest.mark.sphinx("latex", srcdir="test-root")
 def test_latex_output(
 		app: Sphinx,
@@ -52,3 +108,242 @@ def test_latex_output(
 			content,
 			jinja2=True,
 			)
+
+
+@pytest.mark.sphinx("html", srcdir="test-offline", testroot="offline")
+def test_offline_output(app: Sphinx):
+	random.seed("5678")
+
+	app.build(force_all=True)
+
+	page = BeautifulSoup((PathPlus(app.outdir) / "index.html").read_text(), "html5lib")
+	links = {a.get_text(): a["href"] for a in page.select("div.sphinx-highlights a.reference")}
+
+	assert links["widgets.Widget"] == "https://fakelib.example.org/widgets.html#fakelib.widgets.Widget"
+	assert links["widgets.make_widget()"] == "https://fakelib.example.org/widgets.html#fakelib.widgets.make_widget"
+	assert links["DEFAULT_SIZE"] == "https://fakelib.example.org/api.html#fakelib.DEFAULT_SIZE"
+	assert links["fakelib.widgets"] == "https://fakelib.example.org/widgets.html#module-fakelib.widgets"
+
+	text = page.select_one("div.sphinx-highlights").get_text()
+	assert "Widget(name: str, size: int = ..., *children: 'Widget')" in text
+	assert "make_widget(\n  name: str,\n  parent: Optional[Widget] = None,\n  **options: Dict[str, List[int]],\n  ) -> Widget" in text
+	assert "A widget which cannot be imported." in text
+	assert "This paragraph is not part of the summary." not in text
+	assert "Gadget()" in text
+
+
+@pytest.mark.sphinx(
+		"html",
+		srcdir="test-offline-missing",
+		testroot="offline",
+		confoverrides={"highlights_inventories": {"fakelib": ("https://fakelib.example.org/", "missing.inv")}},
+		)
+def test_offline_missing_inventory(app: Sphinx):
+	app.build(force_all=True)
+
+	warnings = app._warning.getvalue()  # type: ignore[attr-defined]
+	assert warnings.count("Unable to read the inventory for 'fakelib'") == 1
+	assert (PathPlus(app.outdir) / "index.html").is_file()
+
+
+@pytest.mark.sphinx("html", srcdir="test-failures", testroot="failures")
+def test_failures_not_retried(app: Sphinx, monkeypatch):
+	imported = []
+	original_import_module = sphinx_highlights.import_module
+
+	def import_module(name: str) -> ModuleType:
+		imported.append(name)
+		return original_import_module(name)
+
+	monkeypatch.setattr(sphinx_highlights, "import_module", import_module)
+	highlight_cache.clear()
+
+	app.build(force_all=True)
+
+	assert sorted(imported) == [
+			"domdf_python_tools.does_not_exist",
+			"domdf_python_tools.paths",
+			"domdf_python_tools.stringlist",
+			]
+
+	warnings = app._warning.getvalue()  # type: ignore[attr-defined]
+	assert "Unable to create highlight for 'domdf_python_tools.paths.NotHere'" in warnings
+	assert "Unable to create highlight for 'domdf_python_tools.does_not_exist.Foo'" in warnings
+
+	failures = failure_cache.get_failures(app.env)
+	assert set(failures) == {"domdf_python_tools.paths.NotHere", "domdf_python_tools.does_not_exist.Foo"}
+	assert failures["domdf_python_tools.paths.NotHere"].summary.startswith("AttributeError: ")
+	assert failures["domdf_python_tools.paths.NotHere"].fingerprint[0][0].endswith("paths.py")  # type: ignore[index]
+	assert failures["domdf_python_tools.does_not_exist.Foo"].summary.startswith("ModuleNotFoundError: ")
+
+	imported.clear()
+	app.build(force_all=True)
+
+	assert imported == []
+	assert "Skipping highlight 'domdf_python_tools.paths.NotHere', which previously failed" in app._warning.getvalue()  # type: ignore[attr-defined]
+
+
+def _unload_reexport_lib() -> None:
+	# As if the next build were in a new process.
+	for name in ("reexport_lib", "reexport_lib._impl"):
+		sys.modules.pop(name, None)
+
+
+@pytest.mark.sphinx("html", srcdir="test-reexport", testroot="reexport")
+def test_failures_retried_when_defining_module_changes(app: Sphinx):
+	_unload_reexport_lib()
+	app.build()
+
+	failures = failure_cache.get_failures(app.env)
+	assert failures["reexport_lib.greet"].summary.startswith("ImportError: ")
+
+	# The object is defined in a module other than the one in its name.
+	_unload_reexport_lib()
+
+	(PathPlus(app.srcdir) / "reexport_lib" / "_impl.py").write_lines([
+			"def greet() -> str:",
+			'\t"""',
+			"\tNew summary.",
+			'\t"""',
+			])
+
+	# The page is reread even though every highlight on it failed.
+	app.build()
+
+	assert "reexport_lib.greet" not in failure_cache.get_failures(app.env)
+	assert "New summary." in (PathPlus(app.outdir) / "index.html").read_text()
+
+
+@pytest.mark.sphinx("html", srcdir="test-missing", testroot="missing")
+def test_failures_retried_when_module_created(app: Sphinx):
+	for name in ("present_lib", "present_lib.sub", "missing_lib"):
+		sys.modules.pop(name, None)
+
+	app.build()
+
+	failures = failure_cache.get_failures(app.env)
+	assert failures["present_lib.sub.func"].summary.startswith("ModuleNotFoundError: ")
+	assert failures["missing_lib.func"].summary.startswith("ModuleNotFoundError: ")
+
+	srcdir = PathPlus(app.srcdir)
+	(srcdir / "present_lib" / "sub.py").write_lines(["def func():", '\t"""', "\tA new submodule.", '\t"""'])
+	(srcdir / "missing_lib").mkdir()
+	(srcdir / "missing_lib" / "__init__.py").write_lines(["def func():", '\t"""', "\tA new package.", '\t"""'])
+	importlib.invalidate_caches()
+
+	app.build()
+
+	assert not failure_cache.get_failures(app.env)
+	text = (PathPlus(app.outdir) / "index.html").read_text()
+	assert "A new submodule." in text
+	assert "A new package." in text
+
+
+@pytest.mark.sphinx(
+		"html",
+		srcdir="test-shared-cache",
+		testroot="failures",
+		confoverrides={"highlights_cache_dir": "_highlights_cache"},
+		)
+def test_shared_cache(app: Sphinx, monkeypatch):
+	imported = []
+	original_import_module = sphinx_highlights.import_module
+
+	def import_module(name: str) -> ModuleType:
+		imported.append(name)
+		return original_import_module(name)
+
+	monkeypatch.setattr(sphinx_highlights, "import_module", import_module)
+	highlight_cache.clear()
+
+	app.build(force_all=True)
+
+	assert "domdf_python_tools.stringlist" in imported
+	assert list((PathPlus(app.confdir) / "_highlights_cache").rglob("*.json"))
+
+	# Another process using the same directory, with an empty in-process cache.
+	imported.clear()
+	highlight_cache.clear()
+	app.build(force_all=True)
+
+	assert "domdf_python_tools.stringlist" not in imported
+	assert "StringList" in (PathPlus(app.outdir) / "index.html").read_text()
+
+
+@pytest.mark.sphinx(
+		"html",
+		srcdir="test-shared-cache-reexport",
+		testroot="reexport",
+		confoverrides={"highlights_cache_dir": "_highlights_cache"},
+		)
+def test_shared_cache_defining_module_changes(app: Sphinx):
+	impl_file = PathPlus(app.srcdir) / "reexport_lib" / "_impl.py"
+	impl_file.write_lines(["def greet() -> str:", '\t"""', "\tOld summary.", '\t"""'])
+
+	_unload_reexport_lib()
+	highlight_cache.clear()
+	app.build(force_all=True)
+	assert "Old summary." in (PathPlus(app.outdir) / "index.html").read_text()
+
+	# Another process using the same directory, after the module the object is re-exported from changes.
+	_unload_reexport_lib()
+	highlight_cache.clear()
+	impl_file.write_lines(["def greet() -> str:", '\t"""', "\tNew summary.", '\t"""'])
+
+	app.build(force_all=True)
+	assert "New summary." in (PathPlus(app.outdir) / "index.html").read_text()
+
+	# The in-process cache, populated from the shared cache, also checks the defining file.
+	_unload_reexport_lib()
+	highlight_cache.clear()
+	app.build(force_all=True)
+
+	_unload_reexport_lib()
+	impl_file.write_lines(["def greet() -> str:", '\t"""', "\tNewer summary.", '\t"""'])
+
+	app.build(force_all=True)
+	assert "Newer summary." in (PathPlus(app.outdir) / "index.html").read_text()
+
+
+@pytest.mark.sphinx(
+		"html",
+		srcdir="test-shared-cache-unusable",
+		testroot="failures",
+		confoverrides={"highlights_cache_dir": "conf.py/_highlights_cache"},
+		)
+def test_shared_cache_unusable(app: Sphinx):
+	highlight_cache.clear()
+	app.build(force_all=True)
+
+	warnings = app._warning.getvalue()  # type: ignore[attr-defined]
+	assert warnings.count("Unable to use the highlights cache") == 1
+	assert "Unable to create highlight for 'domdf_python_tools.stringlist.StringList'" not in warnings
+	assert "StringList" in (PathPlus(app.outdir) / "index.html").read_text()
+
+
+@pytest.mark.sphinx("html", srcdir="test-pools", testroot="pools")
+def test_candidate_pools(app: Sphinx, monkeypatch):
+	resolved = []
+	original_resolve_highlight = sphinx_highlights.resolve_highlight
+
+	def resolve_highlight(app: Sphinx, obj_name: str) -> sphinx_highlights.Highlight:
+		resolved.append(obj_name)
+		return original_resolve_highlight(app, obj_name)
+
+	monkeypatch.setattr(sphinx_highlights, "resolve_highlight", resolve_highlight)
+
+	app.build(force_all=True)
+
+	# The first three directives have the same objects once the module is expanded and duplicates removed,
+	# regardless of the order they are listed in and whether they are written relative to the module.
+	# With only four objects, NotHere is always chosen by the first of them.
+	assert len(candidate_pools) == 2
+	assert sorted(set(resolved)) == sorted(resolved)
+
+	warnings = app._warning.getvalue()  # type: ignore[attr-defined]
+	assert warnings.count("Unable to create highlight for 'domdf_python_tools.paths.NotHere'") == 1
+	assert warnings.count("Skipping highlight 'domdf_python_tools.paths.NotHere', which previously failed") == 2
+
+	for page in ("index.html", "other.html"):
+		soup = BeautifulSoup((PathPlus(app.outdir) / page).read_text(), "html5lib")
+		assert len(soup.select("div.sphinx-highlights div.card")) == 8
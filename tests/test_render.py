@@ -0,0 +1,183 @@
+# stdlib
+import itertools
+import timeit
+import tracemalloc
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+# 3rd party
+import pytest
+from coincidence.selectors import not_pypy
+from domdf_python_tools.stringlist import DelimitedList, StringList
+
+# this package
+from sphinx_highlights._highlight import Highlight, layout_signature
+from sphinx_highlights._render import BulletListWriter, PanelsWriter
+from tests.test_scale import benchmark
+
+# The StringList-based implementation which the writers replaced, kept as a reference.
+
+
+def _legacy_layout_signature(name: str, arguments: Sequence[str], return_annotation: str = '') -> StringList:
+	buf = StringList(".. parsed-literal::")
+	buf.blankline()
+	buf.indent_type = "    "
+	buf.indent_size = 1
+
+	if return_annotation:
+		return_annotation = f") -> {return_annotation}"
+	else:
+		return_annotation = f")"
+
+	arguments_buf: DelimitedList[str] = DelimitedList(arguments)
+	total_length = len(name) + len(return_annotation) + sum(map(len, arguments_buf))
+
+	if total_length <= 60:
+		signature_buf = StringList(''.join([f"{name}(", f"{arguments_buf:, }", return_annotation]))
+	else:
+		signature_buf = StringList([f"{name}("])
+		signature_buf.indent_type = "  "
+		with signature_buf.with_indent_size(1):
+			signature_buf.extend([f"{arguments_buf:,\n}" + ',', return_annotation])
+
+	buf.extend(signature_buf)
+
+	return buf
+
+
+def _legacy_panels(highlights: Iterable[Highlight], colours: Iterator[str], classes: Iterable[str]) -> StringList:
+	classes = list(classes)
+
+	content = StringList()
+	content.append(".. panels::")
+	content.indent_type = "    "
+	content.indent_size = 1
+	content.append(":container: container-xl pb-4 sphinx-highlights")
+	content.blankline()
+
+	for highlight in highlights:
+		colour_class = f"highlight-{next(colours)}"
+		content.append(f":column: {DelimitedList((*classes, colour_class)): }")
+		content.append(highlight.title)
+		content.append('^' * len(content[-1]))
+		content.blankline()
+		content.extend(highlight.signature)
+		content.blankline()
+		content.append(highlight.summary)
+		content.blankline()
+		content.append(f"See more in :mod:`{highlight.module}`.")
+		content.append("---")
+
+	content.pop(-1)
+
+	return content
+
+
+def _legacy_bullet_list(highlights: Iterable[Highlight]) -> StringList:
+	content = StringList()
+	content.indent_type = ' '
+
+	for highlight in highlights:
+		content.append(f"* {highlight.title}")
+
+		with content.with_indent_size(2):
+			content.blankline()
+			content.extend(highlight.signature)
+			content.blankline()
+			content.append(highlight.summary)
+			content.blankline()
+
+	return content
+
+
+_arguments = [
+		"path: :py:class:`~pathlib.Path`",
+		"mode: :py:class:`str` = ``'r'``",
+		r"\*args",
+		"encoding: :py:data:`~typing.Optional`\\[:py:class:`str`] = :py:obj:`None`",
+		r"\*\*kwargs",
+		]
+
+
+def _make_highlights(layout: Callable[..., Sequence[str]]) -> List[Highlight]:
+	return [
+			Highlight(
+					name=f"foo.bar.func_{idx}",
+					title=f":func:`bar.func_{idx}() <.foo.bar.func_{idx}>`",
+					module="foo.bar",
+					signature=list(layout(f"func_{idx}", _arguments[:idx], ":py:class:`int`" if idx % 2 else '')),
+					summary="A function.\nWith a summary over two lines." if idx % 2 else '',
+					) for idx in range(4)
+			]
+
+
+def _render_panels() -> List[str]:
+	writer = PanelsWriter(itertools.cycle(["blue", "red"]), ["col-xl-6", "p-2"])
+	return writer.render(_make_highlights(layout_signature))
+
+
+def _render_legacy_panels() -> List[str]:
+	return list(
+			_legacy_panels(
+					_make_highlights(_legacy_layout_signature),
+					itertools.cycle(["blue", "red"]),
+					["col-xl-6", "p-2"],
+					)
+			)
+
+
+@pytest.mark.parametrize(
+		"name, arguments, return_annotation",
+		[
+				pytest.param("func", [], '', id="empty"),
+				pytest.param("func", _arguments[:2], ":py:class:`int`", id="short"),
+				pytest.param("func", _arguments, ":py:class:`int`", id="long"),
+				pytest.param("func", _arguments, '', id="long_no_return"),
+				pytest.param("func", [], ":py:class:`~typing.Iterator`\\[" * 5 + ":py:class:`int`", id="long_no_arguments"),
+				]
+		)
+def test_layout_signature(name: str, arguments: List[str], return_annotation: str):
+	expected = list(_legacy_layout_signature(name, arguments, return_annotation))
+	assert layout_signature(name, arguments, return_annotation) == expected
+
+
+def test_panels_writer():
+	assert _render_panels() == _render_legacy_panels()
+
+	writer = PanelsWriter(itertools.cycle(["blue"]), [])
+	assert writer.render(_make_highlights(layout_signature))[3] == "    :column: highlight-blue"
+
+
+def test_bullet_list_writer():
+	highlights = _make_highlights(layout_signature)
+	assert BulletListWriter().render(highlights) == list(_legacy_bullet_list(highlights))
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+	func()
+
+	tracemalloc.start()
+	try:
+		baseline = tracemalloc.get_traced_memory()[0]
+		func()
+		return tracemalloc.get_traced_memory()[1] - baseline
+	finally:
+		tracemalloc.stop()
+
+
+@benchmark
+@not_pypy("tracemalloc is CPython only")
+def test_benchmark():
+	# Four highlights, as rendered by a single directive.
+	legacy_time = min(timeit.repeat(_render_legacy_panels, number=200, repeat=5)) / 800
+	writer_time = min(timeit.repeat(_render_panels, number=200, repeat=5)) / 800
+
+	legacy_memory = _peak_memory(_render_legacy_panels) // 4
+	writer_memory = _peak_memory(_render_panels) // 4
+
+	measurements = (
+			f"legacy: {legacy_time * 1e6:.1f}µs and {legacy_memory:,} bytes per highlight, "
+			f"writer: {writer_time * 1e6:.1f}µs and {writer_memory:,} bytes per highlight"
+			)
+
+	assert writer_time < legacy_time, measurements
+	assert writer_memory < legacy_memory, measurements
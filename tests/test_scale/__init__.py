@@ -0,0 +1,12 @@
+# stdlib
+import os
+
+# 3rd party
+import pytest
+
+#: Marks tests whose measurements depend on the machine, the Python implementation and the Sphinx version.
+#: They only run if the ``SPHINX_HIGHLIGHTS_BENCHMARK`` environment variable is set.
+benchmark = pytest.mark.skipif(
+		not os.environ.get("SPHINX_HIGHLIGHTS_BENCHMARK"),
+		reason="Set SPHINX_HIGHLIGHTS_BENCHMARK=1 to run benchmarks",
+		)
@@ -0,0 +1,322 @@
+# stdlib
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.stringlist import StringList
+
+__all__ = ["BuildMetrics", "ProjectShape", "check_regression", "make_project", "measure_build", "member_names"]
+
+_conf_template = """\
+# stdlib
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath('.'))
+random.seed("5678")
+
+extensions = ["sphinx_highlights"]
+project = "sphinx-highlights-scale"
+"""
+
+# Runs a build in a fresh interpreter and reports its own resource usage as JSON on the last line of stdout.
+_runner = """\
+import json, sys, time
+from sphinx.cmd.build import build_main
+
+start = time.perf_counter()
+status = build_main(sys.argv[1:])
+elapsed = time.perf_counter() - start
+
+try:
+	import resource
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform != "darwin":
+		peak_rss *= 1024
+except ImportError:
+	peak_rss = 0
+
+try:
+	import os
+	with open("/proc/self/statm") as fp:
+		final_rss = int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+except (OSError, AttributeError, ValueError):
+	final_rss = 0
+
+print(json.dumps({
+		"status": status,
+		"wall_time": elapsed,
+		"peak_rss": peak_rss,
+		"final_rss": final_rss,
+		"modules": len(sys.modules),
+		}))
+"""
+
+
+class ProjectShape(NamedTuple):
+	"""
+	The size of a synthetic project.
+	"""
+
+	#: The number of modules in the synthetic package.
+	modules: int = 10
+
+	#: The number of functions and classes in each module.
+	members: int = 10
+
+	#: The number of pages containing an :rst:dir:`api-highlights` directive.
+	pages: int = 10
+
+	#: The number of candidates listed in each directive.
+	candidates: int = 8
+
+	#: Memory, in KiB, allocated by each module when it is imported.
+	ballast: int = 0
+
+
+class BuildMetrics(NamedTuple):
+	"""
+	Resource usage of a single ``sphinx-build`` run.
+	"""
+
+	#: Wall time in seconds.
+	wall_time: float
+
+	#: Peak resident set size in bytes.
+	peak_rss: int
+
+	#: The size of ``environment.pickle`` in bytes.
+	pickle_size: int
+
+	#: Resident set size in bytes at the end of the build (Linux only).
+	final_rss: int = 0
+
+	#: The number of modules in :py:data:`sys.modules` at the end of the build.
+	modules: int = 0
+
+
+def _make_member(module_no: int, member_no: int) -> str:
+	name = f"member_{module_no}_{member_no}"
+
+	kind = member_no % 5
+
+	if kind == 0:
+		return textwrap.dedent(
+				f'''
+				def {name}(items: "List[Widget_{module_no}]", *, limit: Optional[int] = None) -> "Dict[str, Widget_{module_no}]":
+					"""
+					Summarise the given widgets.
+
+					:param items:
+					:param limit:
+					"""
+				'''
+				)
+	elif kind == 1:
+		return textwrap.dedent(
+				f'''
+				class {name.title()}(Generic[_T]):
+					"""
+					A generic container of {name} values.
+					"""
+
+					def __init__(self, value: _T, *others: _T, **metadata: "Optional[str]") -> None:
+						self.value = value
+				'''
+				)
+	elif kind == 2:
+		return textwrap.dedent(
+				f'''
+				@dataclass
+				class {name.title()}:
+					"""
+					A dataclass with forward references.
+					"""
+
+					name: str
+					children: "List[Widget_{module_no}]" = field(default_factory=list)
+					parent: "Optional[Widget_{module_no}]" = None
+				'''
+				)
+	elif kind == 3:
+		return textwrap.dedent(
+				f'''
+				def {name}(a: int, b: float = 1.5, c: Union[str, bytes] = "default", *args: Tuple[int, ...], **kwargs: Callable[..., _T]) -> Iterator[_T]:
+					"""
+					A function with a long signature.
+
+					The long signature is wrapped onto multiple lines.
+					"""
+				'''
+				)
+	else:
+		return textwrap.dedent(
+				f'''
+				def {name}(mapping: "Mapping[str, Sequence[Optional[Widget_{module_no}]]]", missing: Mapping[str, "Undefined"]) -> None:
+					"""
+					A function with an unresolvable forward reference.
+					"""
+				'''
+				)
+
+
+def _make_module(module_no: int, shape: ProjectShape) -> str:
+	buf = StringList([
+			"# stdlib",
+			"from dataclasses import dataclass, field",
+			"from typing import Callable, Dict, Generic, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar, Union",
+			'',
+			'_T = TypeVar("_T")',
+			'',
+			'',
+			f"_ballast = bytes(range(256)) * {shape.ballast * 4}",
+			'',
+			'',
+			f"class Widget_{module_no}:",
+			f'\t"""A widget in module {module_no}."""',
+			])
+
+	for member_no in range(shape.members):
+		buf.append(_make_member(module_no, member_no))
+
+	return str(buf)
+
+
+def member_names(shape: ProjectShape) -> List[str]:
+	names = []
+
+	for module_no in range(shape.modules):
+		for member_no in range(shape.members):
+			name = f"member_{module_no}_{member_no}"
+			if member_no % 5 in {1, 2}:
+				name = name.title()
+			names.append(f".module_{module_no}.{name}")
+
+	return names
+
+
+def make_project(srcdir: PathPlus, shape: ProjectShape = ProjectShape(), package: str = "synthetic") -> PathPlus:
+	"""
+	Write a synthetic Sphinx project to ``srcdir``.
+
+	:param srcdir:
+	:param shape:
+	:param package: The name of the synthetic package.
+
+	:returns: The source directory.
+	"""
+
+	srcdir.maybe_make(parents=True)
+	(srcdir / "conf.py").write_clean(_conf_template)
+
+	package_dir = srcdir / package
+	package_dir.maybe_make()
+	(package_dir / "__init__.py").write_clean(f'"""\nThe {package} package.\n"""')
+
+	for module_no in range(shape.modules):
+		(package_dir / f"module_{module_no}.py").write_clean(_make_module(module_no, shape))
+
+	names = member_names(shape)
+	toctree = StringList([".. toctree::", ''])
+
+	for page_no in range(shape.pages):
+		page = StringList([f"Page {page_no}", "=" * len(f"Page {page_no}"), ''])
+		page.append(".. api-highlights::")
+		page.append(f"\t:module: {package}")
+		page.append("\t:colours: blue,green,red,orange")
+		page.blankline(ensure_single=True)
+
+		for candidate_no in range(shape.candidates):
+			page.append(f"\t{names[(page_no * shape.candidates + candidate_no) % len(names)]}")
+
+		(srcdir / f"page_{page_no}.rst").write_clean(str(page))
+		toctree.append(f"\tpage_{page_no}")
+
+	(srcdir / "index.rst").write_clean(str(StringList(["Synthetic", "==========", '', *toctree])))
+
+	return srcdir
+
+
+def measure_build(
+		srcdir: PathPlus,
+		outdir: PathPlus,
+		builder: str = "html",
+		fresh: bool = True,
+		extra_args: Sequence[str] = (),
+		) -> BuildMetrics:
+	"""
+	Build the project in ``srcdir`` in a subprocess and measure its resource usage.
+
+	:param srcdir:
+	:param outdir:
+	:param builder:
+	:param fresh: Whether to discard the saved environment and rebuild everything.
+	:param extra_args: Additional arguments for ``sphinx-build``.
+	"""
+
+	doctreedir = outdir / ".doctrees"
+	args = [sys.executable, "-c", _runner, "-q", "-b", builder, "-d", doctreedir, *extra_args]
+
+	if fresh:
+		args.append("-E")
+
+	args.extend([srcdir, outdir])
+
+	process = subprocess.run(
+			list(map(os.fspath, args)),
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+			universal_newlines=True,
+			check=False,
+			)
+
+	if process.returncode:
+		raise RuntimeError(f"sphinx-build failed:\n{process.stderr}")
+
+	result = json.loads(process.stdout.splitlines()[-1])
+
+	if result["status"]:
+		raise RuntimeError(f"sphinx-build failed:\n{process.stderr}")
+
+	return BuildMetrics(
+			wall_time=result["wall_time"],
+			peak_rss=result["peak_rss"],
+			pickle_size=(doctreedir / "environment.pickle").stat().st_size,
+			final_rss=result["final_rss"],
+			modules=result["modules"],
+			)
+
+
+def check_regression(
+		metrics: BuildMetrics,
+		baseline: Dict[str, float],
+		tolerances: Dict[str, float],
+		) -> Optional[str]:
+	"""
+	Compare ``metrics`` with ``baseline``.
+
+	:param metrics:
+	:param baseline:
+	:param tolerances: Mapping of metric names to the permitted fractional increase over the baseline.
+		Metrics without a tolerance are not checked.
+
+	:returns: A description of the regressions, or :py:obj:`None` if there were none.
+	"""
+
+	failures = []
+
+	for metric, value in metrics._asdict().items():
+		if metric not in tolerances or not baseline.get(metric):
+			continue
+
+		limit = baseline[metric] * (1 + tolerances[metric])
+		if value > limit:
+			failures.append(f"{metric}: {value:,.3f} exceeds {limit:,.3f} (baseline {baseline[metric]:,.3f})")
+
+	return '\n'.join(failures) or None
@@ -0,0 +1,106 @@
+# stdlib
+import json
+import os
+from typing import Dict
+
+# 3rd party
+import pytest
+from coincidence.selectors import not_pypy, not_windows
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from tests.test_scale import benchmark
+from tests.test_scale.synthetic import (
+		BuildMetrics,
+		ProjectShape,
+		check_regression,
+		make_project,
+		measure_build,
+		member_names
+		)
+
+baseline_file = PathPlus(__file__).parent / "baseline.json"
+
+# Permitted fractional increase over the baseline for each metric.
+# Wall time is noisy between machines, so it only catches gross regressions.
+tolerances: Dict[str, float] = {
+		"wall_time": float(os.environ.get("SPHINX_HIGHLIGHTS_TIME_TOLERANCE", 2.0)),
+		"peak_rss": 0.25,
+		"pickle_size": 0.10,
+		}
+
+
+def _check_against_baseline(name: str, metrics: BuildMetrics) -> None:
+	baseline = json.loads(baseline_file.read_text()) if baseline_file.is_file() else {}
+
+	if os.environ.get("SPHINX_HIGHLIGHTS_UPDATE_BASELINE"):
+		baseline[name] = metrics._asdict()
+		baseline_file.dump_json(baseline, indent=2, sort_keys=True)
+		return
+
+	if name not in baseline:
+		pytest.skip(f"No baseline for {name} ({metrics}). Set SPHINX_HIGHLIGHTS_UPDATE_BASELINE=1 to record one.")
+
+	regression = check_regression(metrics, baseline[name], tolerances)
+	if regression:
+		pytest.fail(f"{name} regressed:\n{regression}")
+
+
+@pytest.fixture()
+def scale_project(tmp_pathplus: PathPlus) -> PathPlus:
+	return make_project(tmp_pathplus / "src", ProjectShape())
+
+
+@benchmark
+@not_pypy("The baseline is for CPython")
+@not_windows("Uses the resource module")
+@pytest.mark.parametrize("builder", ["html", "latex"])
+def test_full_and_incremental_build(scale_project: PathPlus, tmp_pathplus: PathPlus, builder: str):
+	outdir = tmp_pathplus / "build"
+
+	_check_against_baseline(f"{builder}-full", measure_build(scale_project, outdir, builder))
+
+	# Touch a single page to trigger an incremental build.
+	(scale_project / "page_0.rst").append_text('\n')
+	_check_against_baseline(f"{builder}-incremental", measure_build(scale_project, outdir, builder, fresh=False))
+
+
+def test_check_regression():
+	baseline = {"wall_time": 1.0, "peak_rss": 100, "pickle_size": 100}
+
+	assert check_regression(BuildMetrics(1.5, 110, 105), baseline, tolerances) is None
+
+	regression = check_regression(BuildMetrics(1.5, 200, 200), baseline, tolerances)
+	assert regression is not None
+	assert "peak_rss" in regression
+	assert "pickle_size" in regression
+	assert "wall_time" not in regression
+
+
+@benchmark
+@not_pypy("Memory is not returned to the OS in the same way")
+@not_windows("Uses the resource module")
+def test_unload_modules(tmp_pathplus: PathPlus):
+	# Each module holds on to 2 MiB.
+	shape = ProjectShape(ballast=2048)
+	srcdir = make_project(tmp_pathplus / "src", shape)
+
+	default = measure_build(srcdir, tmp_pathplus / "default")
+	unloaded = measure_build(
+			srcdir,
+			tmp_pathplus / "unloaded",
+			extra_args=["-D", "highlights_unload_modules=1"],
+			)
+
+	measurements = (
+			f"modules: {default.modules} -> {unloaded.modules}, "
+			f"final RSS: {default.final_rss:,} -> {unloaded.final_rss:,} bytes"
+			)
+
+	# The synthetic package and the modules used by the highlights are unloaded.
+	modules_used = len({name.split('.')[1] for name in member_names(shape)[:shape.pages * shape.candidates]})
+	assert unloaded.modules == default.modules - modules_used - 1, measurements
+
+	if default.final_rss:
+		saved = default.final_rss - unloaded.final_rss
+		assert saved > modules_used * shape.ballast * 1024 * 0.75, measurements
@@ -0,0 +1,115 @@
+# stdlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from sphinx_highlights._highlight import Highlight
+from sphinx_highlights._shared_cache import SharedCache
+
+
+def _make_highlight(name: str) -> Highlight:
+	return Highlight(
+			name=name,
+			title=f":func:`{name}() <.{name}>`",
+			module="foo",
+			signature=[".. parsed-literal::", '', f"    {name}()"],
+			summary="A function.",
+			)
+
+
+def test_round_trip(tmp_pathplus: PathPlus):
+	source = tmp_pathplus / "foo.py"
+	source.write_text("def bar(): pass")
+
+	cache = SharedCache(tmp_pathplus / "cache", 1024 * 1024)
+	key = cache.key("foo.bar", source)
+
+	assert cache.get(key) is None
+	cache.put(key, _make_highlight("foo.bar"))
+	assert cache.get(key) == (_make_highlight("foo.bar"), [])
+
+	# Content-addressed: a different object or different source gives a different key.
+	assert cache.key("foo.baz", source) != key
+	source.write_text("def bar(a): pass")
+	assert cache.key("foo.bar", source) != key
+
+
+def test_defining_file_changed(tmp_pathplus: PathPlus):
+	source = tmp_pathplus / "foo" / "__init__.py"
+	source.parent.mkdir()
+	source.write_text("from foo._impl import bar")
+	defining_file = tmp_pathplus / "foo" / "_impl.py"
+	defining_file.write_text("def bar(): pass")
+
+	cache = SharedCache(tmp_pathplus / "cache", 1024 * 1024)
+	key = cache.key("foo.bar", source)
+	cache.put(key, _make_highlight("foo.bar"), [os.fspath(defining_file)])
+	assert cache.get(key) == (_make_highlight("foo.bar"), [os.fspath(defining_file)])
+
+	# The key is unchanged, but the entry is stale.
+	defining_file.write_text("def bar(a): pass")
+	assert cache.key("foo.bar", source) == key
+	assert cache.get(key) is None
+
+
+def test_unusable_directory(tmp_pathplus: PathPlus, caplog):
+	cache = SharedCache(tmp_pathplus / "cache", 1024 * 1024)
+	(tmp_pathplus / "cache").rmdir()
+	(tmp_pathplus / "cache").write_text("Not a directory")
+
+	# Errors are logged once rather than raised.
+	cache.put("aa01", _make_highlight("foo.bar"))
+	cache.put("bb02", _make_highlight("foo.baz"))
+	assert cache.get("aa01") is None
+	assert cache.evict() == []
+
+	assert caplog.text.count("Unable to use the highlights cache") == 1
+
+
+def test_evict_least_recently_used(tmp_pathplus: PathPlus):
+	cache = SharedCache(tmp_pathplus / "cache", 1024 * 1024)
+
+	for idx, key in enumerate(["aa01", "bb02", "cc03", "dd04"]):
+		cache.put(key, _make_highlight(f"foo.func_{idx}"))
+		os.utime(cache._path(key), ns=(idx * 10**9, idx * 10**9))
+
+	# Reading marks the entry as recently used.
+	assert cache.get("aa01") is not None
+
+	entry_size = os.stat(cache._path("bb02")).st_size
+	cache.max_size = entry_size * 2 + 1
+
+	assert cache.evict() == ["bb02", "cc03"]
+	assert cache.get("aa01") is not None
+	assert cache.get("dd04") is not None
+	assert cache.get("bb02") is None
+
+
+def _populate(directory: str, worker: int) -> None:
+	cache = SharedCache(directory, 10 * 1024 * 1024)
+
+	for idx in range(20):
+		# Half of the keys are shared between workers.
+		key = f"{idx % 10:02d}{worker if idx >= 10 else 0}"
+		cache.put(key, _make_highlight(f"foo.func_{key}"))
+		assert cache.get(key) == (_make_highlight(f"foo.func_{key}"), [])
+
+	cache.evict()
+
+
+def test_concurrent_writers(tmp_pathplus: PathPlus):
+	directory = os.fspath(tmp_pathplus / "cache")
+
+	with ProcessPoolExecutor(max_workers=4) as executor:
+		for result in [executor.submit(_populate, directory, worker) for worker in range(4)]:
+			result.result()
+
+	cache = SharedCache(directory, 10 * 1024 * 1024)
+	for worker in range(4):
+		for idx in range(10):
+			assert cache.get(f"{idx:02d}{worker}") is not None
+
+	assert not list(PathPlus(directory).rglob("*.tmp"))
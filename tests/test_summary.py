@@ -0,0 +1,93 @@
+# stdlib
+import inspect
+from typing import Optional
+
+# 3rd party
+import pytest
+
+# this package
+from sphinx_highlights import get_summary
+
+
+def _plain():
+	"""
+	Returns the first paragraph
+	of the docstring.
+
+	And not the second.
+	"""
+
+
+def _first_line():
+	"""Summary on the first line,
+	continued on the second.
+
+	More details.
+	"""
+
+
+def _numpydoc():
+	"""
+	Summary followed immediately by a section.
+	Parameters
+	----------
+	a : int
+	"""
+
+
+def _google():
+	"""
+	Summary followed immediately by a section.
+	Args:
+		a: An integer.
+	"""
+
+
+def _field_list():
+	"""
+	Summary followed immediately by a field list.
+	:param a:
+	"""
+
+
+def _doctest():
+	"""
+	Summary followed immediately by a doctest.
+	>>> _doctest()
+	"""
+
+
+def _only_sections():
+	"""
+	Returns
+	-------
+	int
+	"""
+
+
+@pytest.mark.parametrize(
+		"docstring, expected",
+		[
+				pytest.param(_plain.__doc__, "Returns the first paragraph\nof the docstring.", id="plain"),
+				pytest.param(
+						_first_line.__doc__,
+						"Summary on the first line,\ncontinued on the second.",
+						id="first_line",
+						),
+				pytest.param(_numpydoc.__doc__, "Summary followed immediately by a section.", id="numpydoc"),
+				pytest.param(_google.__doc__, "Summary followed immediately by a section.", id="google"),
+				pytest.param(_field_list.__doc__, "Summary followed immediately by a field list.", id="field_list"),
+				pytest.param(_doctest.__doc__, "Summary followed immediately by a doctest.", id="doctest"),
+				pytest.param(_only_sections.__doc__, '', id="only_sections"),
+				pytest.param("One line", "One line", id="one_line"),
+				pytest.param('', '', id="empty"),
+				pytest.param(None, '', id="none"),
+				]
+		)
+def test_get_summary(docstring: Optional[str], expected: str):
+	assert get_summary(docstring) == expected
+
+
+@pytest.mark.parametrize("obj", [_plain, _first_line, inspect.cleandoc, pytest.param])
+def test_get_summary_matches_cleandoc(obj: object):
+	assert get_summary(obj.__doc__) == inspect.cleandoc(obj.__doc__ or '').split("\n\n")[0]